@@ -2,26 +2,36 @@
 Discord bot client setup and event handlers
 """
 
+import asyncio
+import re
 import discord
 from discord import app_commands
 from typing import Set
 
-from config.settings import MOD_FLAG
+from config.settings import MOD_FLAG, MIN_CLASSIFY_LEN, STRIKE_WINDOW_SEC
 from moderation.classifier import MessageClassifier
 from moderation.actions import ModerationActions
-from utils.logging import ModLogger
+from utils.logging import ModLogger, log
 from bot.commands import setup_commands
 from data.db import init_pool
 
 # NEW: DB-backed repos
-from data.whitelist_repo import wl_is_whitelisted
-from data.strikes_repo import strike_bump
+from data.whitelist_repo import cached_wl_is_whitelisted, wl_start_listener, wl_seed_counts
+from data.strikes_repo import strike_bump, strike_bump_many, flush_positive_points
 
-# Strike window (seconds) — change in settings if you have a constant there
-try:
-    from config.settings import STRIKE_WINDOW_SEC  # e.g., 3600
-except Exception:
-    STRIKE_WINDOW_SEC = 3600
+# Messages made only of mentions / custom emoji (and whitespace) aren't worth classifying
+_TRIVIAL_RE = re.compile(r"^(?:\s|<(?:@[!&]?|#|a?:\w+:)\d+>)*$")
+
+# Strike writes are coalesced: flush at most this many bumps, or after this long
+STRIKE_FLUSH_MAX = 200
+STRIKE_FLUSH_INTERVAL = 0.05
+
+# Lowercased once; topic checks run on the message hot path
+MOD_FLAG_LOWER = MOD_FLAG.lower()
+
+# discord.py already runs each on_message as its own task; this caps how many of them may
+# be in the AI/DB/REST pipeline at once, so a raid queues up instead of fanning out unbounded
+MAX_INFLIGHT_MODERATION = 64
 
 
 class ModerationBot:
@@ -34,7 +44,7 @@ class ModerationBot:
         intents.guilds = True
         intents.messages = True
 
-        self.client = discord.Client(intents=intents)
+        self.client = discord.AutoShardedClient(intents=intents, shard_count=None)
         self.tree = app_commands.CommandTree(self.client)
 
         # Components
@@ -43,7 +53,21 @@ class ModerationBot:
         self.logger = ModLogger()
 
         # State
+        self._self_id = 0  # our own user id, set on ready
         self.moderated_channels: Set[int] = set()
+        # Sorted view of moderated_channels, rebuilt lazily after changes
+        self._moderated_sorted: tuple[int, ...] | None = None
+        # Immutable copy of moderated_channels read by the message hot path
+        self._mod_snapshot: frozenset[int] = frozenset()
+        # Bumped whenever moderated_channels changes, so derived views can be cached
+        self._mod_channels_version = 0
+        # channel_id -> whether its topic carries MOD_FLAG
+        self._topic_flag_cache: dict[int, bool] = {}
+        # Pending strike bumps, drained by _strike_flusher (created once the loop runs)
+        self._strike_queue: asyncio.Queue | None = None
+        self._strike_flusher_task: asyncio.Task | None = None
+        # Bounds concurrent _moderate() pipelines (see MAX_INFLIGHT_MODERATION)
+        self._moderation_slots = asyncio.Semaphore(MAX_INFLIGHT_MODERATION)
 
         # Setup events
         self._setup_events()
@@ -58,12 +82,27 @@ class ModerationBot:
         async def on_ready():
             # Ensure DB pool exists before any repo calls
             await init_pool()
+            # Keep whitelist caches coherent with other shards/processes
+            await wl_start_listener()
+            await wl_seed_counts()
             await self._on_ready()
 
         @self.client.event
         async def on_message(message: discord.Message):
             await self._on_message(message)
 
+        @self.client.event
+        async def on_guild_channel_delete(channel: discord.abc.GuildChannel):
+            self.logger.forget_log_channel(channel)
+            self.invalidate_topic_flag(channel.id)
+
+        @self.client.event
+        async def on_guild_channel_update(before: discord.abc.GuildChannel,
+                                          after: discord.abc.GuildChannel):
+            # Topics edited by hand (not via /moderate_here) must reach the thread fallback too
+            if getattr(before, "topic", None) != getattr(after, "topic", None):
+                self.invalidate_topic_flag(after.id)
+
         @self.client.event
         async def on_command_error(ctx, error):
             print(f"Command error: {error}")
@@ -71,51 +110,98 @@ class ModerationBot:
         @self.tree.error
         async def on_app_command_error(inter: discord.Interaction,
                                        error: app_commands.AppCommandError):
+            if isinstance(error, app_commands.MissingPermissions):
+                if "manage_guild" in error.missing_permissions:
+                    msg = "❌ Administrator permissions required."
+                else:
+                    msg = "❌ Manage Messages permission required."
+            else:
+                msg = f"❌ An error occurred: {error}"
             if not inter.response.is_done():
-                await inter.response.send_message(
-                    f"❌ An error occurred: {error}",
-                    ephemeral=True
-                )
+                await inter.response.send_message(msg, ephemeral=True)
+            else:
+                # Deferred commands can only be answered with a followup
+                await inter.followup.send(msg, ephemeral=True)
 
     async def _on_ready(self):
         """Handle bot ready event"""
+        self._self_id = self.client.user.id
+
         # Scan all text channels for moderation flag
         self.moderated_channels.clear()
+        self._topic_flag_cache.clear()
         for guild in self.client.guilds:
             for channel in guild.text_channels:
-                if self._topic_has_flag(channel.topic):
+                flagged = self._topic_has_flag(channel.topic)
+                self._topic_flag_cache[channel.id] = flagged
+                if flagged:
                     self.moderated_channels.add(channel.id)
+        self._moderated_sorted = None
+        self._mod_snapshot = frozenset(self.moderated_channels)
+        self._mod_channels_version += 1
+
+        # Start the strike writer once (on_ready fires again on reconnect)
+        if self._strike_flusher_task is None:
+            self._strike_queue = asyncio.Queue()
+            self._strike_flusher_task = asyncio.create_task(self._strike_flusher())
 
         # Sync slash commands
         try:
             synced = await self.tree.sync()
-            print(f"✅ Synced {len(synced)} commands")
+            log.info("✅ Synced %d commands", len(synced))
         except Exception as e:
-            print(f"❌ Failed to sync commands: {e}")
+            log.error("❌ Failed to sync commands: %s", e)
 
-        print(f"🤖 {self.client.user} is ready!")
-        print(f"📊 Monitoring {len(self.moderated_channels)} channels across {len(self.client.guilds)} guilds")
-        print(f"🔍 Channels: {sorted(self.moderated_channels)}")
+        log.info("🤖 %s is ready!", self.client.user)
+        log.info("📊 Monitoring %d channels across %d guilds",
+                 len(self.moderated_channels), len(self.client.guilds))
+        log.info("🔍 Channels: %s", list(self.sorted_moderated_channels()))
 
     async def _on_message(self, message: discord.Message):
         """Handle incoming messages for moderation"""
-        # Skip bots and DMs
-        if message.author.bot or message.guild is None:
+        # Only moderate flagged channels (threads inherit parent status). Checked first: most
+        # traffic is in unmoderated channels, and DM channels are never in the set either
+        ch = message.channel
+        parent_id = getattr(ch, "parent_id", None)
+        if (parent_id or ch.id) not in self._mod_snapshot:
+            # Threads may sit under a flagged parent that isn't indexed yet
+            if parent_id is None or not self._is_message_in_moderated_scope(message):
+                return
+
+        # Skip DMs, our own messages, and other bots
+        author = message.author
+        if message.guild is None or author.id == self._self_id or author.bot:
             return
 
-        # Only moderate flagged channels (threads inherit parent status)
-        if not self._is_message_in_moderated_scope(message):
+        # Skip filler ("ok", "👍", bare pings) without calling the AI services
+        content = message.content
+        if len(content.strip()) < MIN_CLASSIFY_LEN or _TRIVIAL_RE.match(content):
             return
 
-        # Classify message content
-        level, reason, analysis = await self.classifier.classify_message(
-            message.content, message.author.id, message.guild.id
+        async with self._moderation_slots:
+            await self._moderate(message)
+
+    async def _moderate(self, message: discord.Message):
+        """Classify a message in a moderated channel and enforce the result"""
+        # Start the whitelist lookup (DB) so it overlaps with classification (HTTP)
+        wl_task = asyncio.create_task(
+            cached_wl_is_whitelisted(str(message.guild.id), str(message.author.id))
         )
+
+        # Classify message content
+        try:
+            level, reason, analysis = await self.classifier.classify_message(
+                message.content, message.author.id, message.guild.id
+            )
+        except Exception:
+            wl_task.cancel()
+            raise
         if level == "none":
+            wl_task.cancel()
             return
 
         # Skip if user is whitelisted (DB)
-        if await wl_is_whitelisted(str(message.guild.id), str(message.author.id)):
+        if await wl_task:
             # Optional: log that enforcement was skipped due to whitelist
             await self.logger.log_moderation_action(
                 message.guild, message.author, message.channel,
@@ -127,10 +213,9 @@ class ModerationBot:
             return
 
         # Bump strikes in DB (this writes/updates the strikes table)
-        strike_count, reset_at = await strike_bump(
+        strike_count, reset_at = await self._enqueue_strike(
             str(message.guild.id),
-            str(message.author.id),
-            window_sec=STRIKE_WINDOW_SEC
+            str(message.author.id)
         )
 
         # Execute moderation action (delete/warn/timeout/kick)
@@ -144,11 +229,60 @@ class ModerationBot:
             level, reason, strike_count, action_result, analysis
         )
 
+    # ---------- strike writer ----------
+
+    async def _enqueue_strike(self, guild_id: str, user_id: str) -> tuple[int, int]:
+        """Queue a strike bump for the next batched flush and wait for its result"""
+        if self._strike_queue is None:
+            return await strike_bump(guild_id, user_id, window_sec=STRIKE_WINDOW_SEC)
+        fut = asyncio.get_running_loop().create_future()
+        self._strike_queue.put_nowait((guild_id, user_id, fut))
+        return await fut
+
+    async def _strike_flusher(self):
+        """Drain queued strike bumps and write each batch with one upsert"""
+        loop = asyncio.get_running_loop()
+        queue = self._strike_queue
+        stopping = False
+        while not stopping:
+            item = await queue.get()
+            if item is None:  # stop sentinel from _drain
+                return
+            batch = [item]
+            deadline = loop.time() + STRIKE_FLUSH_INTERVAL
+            while len(batch) < STRIKE_FLUSH_MAX:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True  # write what we have, then stop
+                    break
+                batch.append(item)
+
+            try:
+                results = await strike_bump_many(
+                    [(g, u) for g, u, _ in batch], window_sec=STRIKE_WINDOW_SEC
+                )
+            except Exception as e:
+                log.error("Strike flush error: %s", e)
+                for _, _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+
+            for (_, _, fut), result in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(result)
+
     # ---------- helpers ----------
 
     def _topic_has_flag(self, topic: str | None) -> bool:
         """Check if channel topic contains moderation flag"""
-        return bool(topic) and MOD_FLAG.lower() in topic.lower()
+        return bool(topic) and MOD_FLAG_LOWER in topic.lower()
 
     def _is_message_in_moderated_scope(self, message: discord.Message) -> bool:
         """
@@ -158,21 +292,43 @@ class ModerationBot:
         # Threads: honor parent channel's topic flag
         if isinstance(ch, (discord.Thread,)):
             parent = ch.parent
-            if parent and parent.id in self.moderated_channels:
+            if not parent:
+                return False
+            if parent.id in self.moderated_channels:
                 return True
             # also allow parent topic flag (in case state wasn't rebuilt yet)
-            return bool(parent and self._topic_has_flag(parent.topic))
+            flagged = self._topic_flag_cache.get(parent.id)
+            if flagged is None:
+                flagged = self._topic_has_flag(parent.topic)
+                self._topic_flag_cache[parent.id] = flagged
+            return flagged
 
         # Regular text channel
         return ch.id in self.moderated_channels
 
+    def invalidate_topic_flag(self, channel_id: int):
+        """Forget the cached topic flag for a channel (call after editing its topic)"""
+        self._topic_flag_cache.pop(channel_id, None)
+
     def add_moderated_channel(self, channel_id: int):
         """Add channel to moderation list"""
         self.moderated_channels.add(channel_id)
+        self._moderated_sorted = None
+        self._mod_snapshot = frozenset(self.moderated_channels)
+        self._mod_channels_version += 1
 
     def remove_moderated_channel(self, channel_id: int):
         """Remove channel from moderation list"""
         self.moderated_channels.discard(channel_id)
+        self._moderated_sorted = None
+        self._mod_snapshot = frozenset(self.moderated_channels)
+        self._mod_channels_version += 1
+
+    def sorted_moderated_channels(self) -> tuple[int, ...]:
+        """Moderated channel ids in ascending order (cached until the set changes)"""
+        if self._moderated_sorted is None:
+            self._moderated_sorted = tuple(sorted(self.moderated_channels))
+        return self._moderated_sorted
 
     def is_channel_moderated(self, channel_id: int) -> bool:
         """Check if channel is being moderated"""
@@ -180,7 +336,40 @@ class ModerationBot:
 
     def run(self, token: str):
         """Start the bot"""
-        self.client.run(token)
+        # Faster event loop when available (not on Windows); passed as the loop factory
+        # rather than uvloop.install(), which patches the global policy and is deprecated
+        try:
+            import uvloop
+            loop_factory = uvloop.new_event_loop
+        except ImportError:
+            loop_factory = None
+        # What client.run() does, plus closing our own HTTP session on the way out
+        discord.utils.setup_logging()
+        try:
+            asyncio.run(self._run(token), loop_factory=loop_factory)
+        except KeyboardInterrupt:
+            pass
+
+    async def _run(self, token: str):
+        try:
+            async with self.client:
+                await self.client.start(token)
+        finally:
+            await self._drain()
+            await self.classifier.detector.close()
+
+    async def _drain(self):
+        """Write batched state that would otherwise be lost on shutdown"""
+        if self._strike_flusher_task is not None:
+            # Everything queued ahead of the sentinel is written before the flusher exits;
+            # stragglers after this go straight to strike_bump
+            queue, self._strike_queue = self._strike_queue, None
+            queue.put_nowait(None)
+            await asyncio.gather(self._strike_flusher_task, return_exceptions=True)
+        try:
+            await flush_positive_points()
+        except Exception as e:
+            log.error("Error flushing positive points on shutdown: %s", e)
 
 
 def create_bot() -> ModerationBot:
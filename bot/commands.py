@@ -2,43 +2,212 @@
 Discord slash commands for the moderation bot (DB-backed whitelist & strikes)
 """
 
+import asyncio
+import functools
+import re
+import time
 import discord
 from discord import app_commands
-from datetime import datetime, timezone
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Literal
 
 if TYPE_CHECKING:
     from bot.client import ModerationBot
 
-from config.settings import MOD_FLAG
+from config.settings import MOD_FLAG, PERSPECTIVE_API_KEY, OPENAI_API_KEY
+from utils.helpers import utcnow_cached
+from utils.logging import log
 
-from data.whitelist_repo import wl_add, wl_remove, wl_count
+from data.whitelist_repo import wl_add, wl_remove, cached_wl_count
 from data.strikes_repo import (
     get_user_immunity, 
     get_immunity_leaderboard, 
     process_weekly_bonus,
-    add_positive_points,
+    add_positive_points_returning,
     strike_get,
     strike_clear,
-
+    cleanup_expired_strikes_many,
+    cached_guild_stats,
 )
 
-# Optional: if you add it, we'll use it; otherwise we fallback
-try:
-    from data.strikes_repo import guild_stats  # async (guild_id) -> dict
-except Exception:
-    guild_stats = None  # type: ignore
+# Embed colors, built once rather than per command call
+_COL_BLUE = discord.Color.blue()
+_COL_ORANGE = discord.Color.orange()
+_COL_GREEN = discord.Color.green()
+_COL_GRAY = discord.Color.gray()
+_COL_GOLD = discord.Color.gold()
+
+# Immunity level display text (full label, and the bare emoji used in the leaderboard)
+_IMMUNITY_LEVEL_LABELS = {
+    "none": "⚪ None",
+    "trusted": "🟢 Trusted Member",
+    "veteran": "🔵 Veteran Guardian",
+    "guardian": "🟣 Community Guardian"
+}
+_IMMUNITY_LEVEL_EMOJI = {
+    "guardian": "🟣",
+    "veteran": "🔵",
+    "trusted": "🟢",
+    "none": "⚪"
+}
+
+# Matches the flag plus surrounding whitespace (case-insensitive, like bot._topic_has_flag)
+_MOD_FLAG_RE = re.compile(rf"\s*{re.escape(MOD_FLAG)}\s*", re.IGNORECASE)
+
+# Strong refs to fire-and-forget tasks so they aren't GC'd mid-flight; capped so a
+# stalled log channel can't pile up unbounded work
+MAX_BACKGROUND_TASKS = 100
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _bg_done(task: asyncio.Task):
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception():
+        log.error("Background task error: %s", task.exception())
+
+
+def _bg(coro) -> asyncio.Task | None:
+    """Run a coroutine (e.g. audit logging) without delaying the interaction reply"""
+    if len(_background_tasks) >= MAX_BACKGROUND_TASKS:
+        coro.close()
+        log.warning("Background task dropped: %d already pending", MAX_BACKGROUND_TASKS)
+        return None
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_bg_done)
+    return task
+
+
+def defer_ephemeral(func):
+    """Ack the interaction with an ephemeral defer before running the command (answer via followup)"""
+    @functools.wraps(func)
+    async def wrapper(interaction: discord.Interaction, *args, **kwargs):
+        await interaction.response.defer(ephemeral=True)
+        return await func(interaction, *args, **kwargs)
+    return wrapper
+
+
+async def _maybe_remove_timeout(member: discord.Member | None) -> str:
+    """Lift an active timeout; returns a note for the reply ("" if there was none)"""
+    if not (member and member.is_timed_out()):
+        return ""
+    try:
+        await member.edit(timed_out_until=None, reason="Strikes cleared")
+        return "\nAlso removed active timeout."
+    except discord.Forbidden:
+        return "\n⚠️ Missing permission to remove timeout."
+    except discord.HTTPException as e:
+        return f"\n⚠️ Failed to remove timeout: {e}"
+
+
+PERMS_CACHE_TTL_SEC = 15
+PERMS_CACHE_MAX = 1024
+
+# Cleanup requests arriving within this window share one batched DB call
+CLEANUP_BATCH_DELAY = 0.1
+_pending_cleanups: dict[str, asyncio.Future] = {}
+# The scheduled flush must always run (waiters hang otherwise), so it bypasses _bg's cap
+_cleanup_flush_task: asyncio.Task | None = None
+
+
+async def _flush_cleanups():
+    await asyncio.sleep(CLEANUP_BATCH_DELAY)
+    batch = dict(_pending_cleanups)
+    _pending_cleanups.clear()
+    try:
+        counts = await cleanup_expired_strikes_many(list(batch))
+    except Exception as e:
+        for fut in batch.values():
+            if not fut.done():
+                fut.set_exception(e)
+        return
+    for gid, fut in batch.items():
+        if not fut.done():
+            fut.set_result(counts.get(gid, 0))
+
+
+async def _queued_cleanup(guild_id: str) -> int:
+    """Expired-strike cleanup for a guild, coalesced with other guilds' requests"""
+    global _cleanup_flush_task
+    fut = _pending_cleanups.get(guild_id)
+    if fut is None:
+        if not _pending_cleanups:
+            _cleanup_flush_task = asyncio.create_task(_flush_cleanups())
+        fut = _pending_cleanups[guild_id] = asyncio.get_running_loop().create_future()
+    return await asyncio.shield(fut)
+
+
+# Keeps the "Moderated Channels" field under Discord's 1024-char field limit
+MAX_LISTED_CHANNELS = 30
+
+# With neither moderation API configured, /test_message skips straight to the fallback patterns
+_APIS_ENABLED = bool(PERSPECTIVE_API_KEY or OPENAI_API_KEY)
+
+# API keys are fixed for the process lifetime, so the /bot_info status text is too
+_API_STATUS_VALUE = "\n".join([
+    "✅ Perspective API" if PERSPECTIVE_API_KEY else "❌ Perspective API",
+    "✅ OpenAI API" if OPENAI_API_KEY else "❌ OpenAI API",
+])
+
+# Static embed skeletons for the status commands; only field values change per call
+_MOD_STATUS_TEMPLATE = {
+    "title": "🛡️ Moderation Status",
+    "color": _COL_BLUE.value,
+    "fields": [
+        {"name": "Moderated Channels", "inline": False},
+        {"name": "Whitelisted Users", "inline": True},
+        {"name": "Active Users With Strikes", "inline": True},
+        {"name": "Total Strikes (current windows)", "inline": True},
+    ],
+}
+
+_BOT_INFO_TEMPLATE = {
+    "title": "🤖 ModBot Information",
+    "color": _COL_BLUE.value,
+    "fields": [
+        {"name": "Bot Status", "inline": True},
+        {"name": "Moderation", "inline": True},
+        {"name": "AI Services", "inline": True},
+        {"name": "Permissions", "inline": False},
+    ],
+}
+
+
+def _embed_from_template(template: dict, *values: str) -> discord.Embed:
+    """Build an embed from a template, filling field values in order (unfilled fields are dropped)"""
+    data = {k: v for k, v in template.items() if k != "fields"}
+    data["fields"] = [{**field, "value": value} for field, value in zip(template["fields"], values)]
+    embed = discord.Embed.from_dict(data)
+    embed.timestamp = utcnow_cached()
+    return embed
+
 
 def setup_commands(tree: app_commands.CommandTree, bot: 'ModerationBot'):
     """Setup all slash commands"""
 
+    # (guild_id, channel_id, hash of our role ids) -> (Permissions, monotonic expiry)
+    perms_cache: dict[tuple[int, int, int], tuple[discord.Permissions, float]] = {}
+
+    def channel_perms(channel, me: discord.Member) -> discord.Permissions:
+        """Our resolved permissions in a channel, cached briefly for /bot_info polling"""
+        key = (me.guild.id, channel.id, hash(tuple(r.id for r in me.roles)))
+        now = time.monotonic()
+        hit = perms_cache.get(key)
+        if hit and hit[1] > now:
+            return hit[0]
+        perms = channel.permissions_for(me)
+        if len(perms_cache) >= PERMS_CACHE_MAX:
+            # Role changes leave old keys behind for good; drop whatever has expired
+            for stale in [k for k, v in perms_cache.items() if v[1] <= now]:
+                del perms_cache[stale]
+        perms_cache[key] = (perms, now + PERMS_CACHE_TTL_SEC)
+        return perms
+
+    # guild_id -> (bot._mod_channels_version, rendered "Moderated Channels" text)
+    mod_channels_cache: dict[int, tuple[int, str]] = {}
+
     @tree.command(name="moderate_here", description="Toggle moderation for this channel")
+    @app_commands.checks.has_permissions(manage_guild=True)
     async def moderate_here(interaction: discord.Interaction):
-        if not interaction.user.guild_permissions.manage_guild:
-            return await interaction.response.send_message(
-                "❌ Administrator permissions required.", ephemeral=True
-            )
-
         channel = interaction.channel
         if not isinstance(channel, discord.TextChannel):
             return await interaction.response.send_message(
@@ -46,31 +215,34 @@ def setup_commands(tree: app_commands.CommandTree, bot: 'ModerationBot'):
             )
 
         topic = channel.topic or ""
+        guild, actor = interaction.guild, interaction.user
+        log = bot.logger.log_system_event
         try:
             if bot._topic_has_flag(topic):
                 # Remove moderation
-                new_topic = topic.replace(MOD_FLAG, "").strip()
+                new_topic = _MOD_FLAG_RE.sub(" ", topic).strip()
                 await channel.edit(topic=new_topic or None)
+                bot.invalidate_topic_flag(channel.id)
                 bot.remove_moderated_channel(channel.id)
                 msg = f"✅ **Moderation disabled** for {channel.mention}"
 
-                await bot.logger.log_system_event(
-                    interaction.guild, "Moderation Disabled",
-                    f"{interaction.user.mention} disabled moderation in {channel.mention}"
-                )
+                _bg(log(
+                    guild, "Moderation Disabled",
+                    f"{actor.mention} disabled moderation in {channel.mention}"
+                ))
             else:
                 # Add moderation
-                sep = " " if topic and not topic.endswith(" ") else ""
-                new_topic = f"{topic}{sep}{MOD_FLAG}".strip()
+                new_topic = f"{topic.rstrip()} {MOD_FLAG}".strip()
                 await channel.edit(topic=new_topic)
+                bot.invalidate_topic_flag(channel.id)
                 bot.add_moderated_channel(channel.id)
                 msg = f"✅ **Moderation enabled** for {channel.mention}"
 
-                await bot.logger.log_system_event(
-                    interaction.guild, "Moderation Enabled",
-                    f"{interaction.user.mention} enabled moderation in {channel.mention}",
+                _bg(log(
+                    guild, "Moderation Enabled",
+                    f"{actor.mention} enabled moderation in {channel.mention}",
                     "success"
-                )
+                ))
 
             await interaction.response.send_message(msg, ephemeral=True)
 
@@ -82,66 +254,69 @@ def setup_commands(tree: app_commands.CommandTree, bot: 'ModerationBot'):
             await interaction.response.send_message(f"❌ Error: {e}", ephemeral=True)
 
     @tree.command(name="mod_status", description="Show moderation status and basic stats")
+    @defer_ephemeral
     async def mod_status(interaction: discord.Interaction):
-        embed = discord.Embed(
-            title="🛡️ Moderation Status",
-            color=discord.Color.blue(),
-            timestamp=datetime.now(timezone.utc)
-        )
-
-        # Moderated channels
-        channel_mentions = []
-        for channel_id in sorted(bot.moderated_channels):
-            ch = interaction.guild.get_channel(channel_id)
-            channel_mentions.append(ch.mention if ch else f"`{channel_id}`")
-        channels_text = "\n".join(channel_mentions) if channel_mentions else "None"
-        embed.add_field(name="Moderated Channels", value=channels_text, inline=False)
+        guild_id = interaction.guild_id
+        gid = str(guild_id)
 
-        # Whitelist count (DB)
-        try:
-            wl_cnt = await wl_count(str(interaction.guild_id))
-        except Exception:
+        # Moderated channels (re-rendered only after the set changes)
+        cached = mod_channels_cache.get(guild_id)
+        if cached and cached[0] == bot._mod_channels_version:
+            channels_text = cached[1]
+        else:
+            # The moderated set spans every guild; list only this guild's channels
+            get_channel = interaction.guild.get_channel
+            channels = [
+                ch for channel_id in bot.sorted_moderated_channels()
+                if (ch := get_channel(channel_id))
+            ]
+            shown = channels[:MAX_LISTED_CHANNELS]
+            channel_mentions = [ch.mention for ch in shown]
+            if len(channels) > len(shown):
+                channel_mentions.append(f"…+{len(channels) - len(shown)} more")
+            channels_text = "\n".join(channel_mentions) if channel_mentions else "None"
+            mod_channels_cache[guild_id] = (bot._mod_channels_version, channels_text)
+
+        # Whitelist count + strike stats (DB), fetched concurrently
+        wl_cnt, gs = await asyncio.gather(
+            cached_wl_count(gid),
+            cached_guild_stats(gid),
+            return_exceptions=True
+        )
+        if isinstance(wl_cnt, Exception):
             wl_cnt = "—"
-        embed.add_field(name="Whitelisted Users", value=str(wl_cnt), inline=True)
+        values = [channels_text, str(wl_cnt)]
 
-        # Strike stats (optional DB helper)
-        if guild_stats:
-            try:
-                gs = await guild_stats(str(interaction.guild_id))
-                embed.add_field(name="Active Users With Strikes", value=str(gs.get("active_users", 0)), inline=True)
-                embed.add_field(name="Total Strikes (current windows)", value=str(gs.get("total_strikes", 0)), inline=True)
-            except Exception:
-                embed.add_field(name="Active Users With Strikes", value="—", inline=True)
-                embed.add_field(name="Total Strikes", value="—", inline=True)
+        # Strike stats
+        if isinstance(gs, Exception):
+            values += ["—", "—"]
+        else:
+            values += [str(gs.get("active_users", 0)), str(gs.get("total_strikes", 0))]
 
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        embed = _embed_from_template(_MOD_STATUS_TEMPLATE, *values)
+        await interaction.followup.send(embed=embed, ephemeral=True)
 
     # Kept your single command with an action param for compatibility
     @tree.command(name="whitelist", description="Add/remove a user from the moderation whitelist")
+    @app_commands.checks.has_permissions(manage_guild=True)
+    @defer_ephemeral
     async def whitelist_user(
         interaction: discord.Interaction,
         user: discord.User,
-        action: str,
+        action: Literal["add", "remove"],
         reason: str = ""
     ):
-        if not interaction.user.guild_permissions.manage_guild:
-            return await interaction.response.send_message(
-                "❌ Administrator permissions required.", ephemeral=True
-            )
-
-        action_l = action.strip().lower()
-        if action_l not in ("add", "remove"):
-            return await interaction.response.send_message(
-                "❌ Action must be 'add' or 'remove'.", ephemeral=True
-            )
+        guild, actor = interaction.guild, interaction.user
+        gid = str(guild.id)
+        log = bot.logger.log_system_event
 
         try:
-            if action_l == "add":
+            if action == "add":
                 res = await wl_add(
-                    str(interaction.guild_id),
+                    gid,
                     str(user.id),
                     reason or None,
-                    str(interaction.user.id)
+                    str(actor.id)
                 )
                 if res["inserted"]:
                     msg = f"✅ Added {user.mention} to whitelist."
@@ -150,18 +325,16 @@ def setup_commands(tree: app_commands.CommandTree, bot: 'ModerationBot'):
                     msg = f"ℹ️ {user.mention} was already whitelisted — details updated."
                     log_title = "Whitelist Updated"
 
-                await interaction.response.send_message(msg, ephemeral=True)
+                await interaction.followup.send(msg, ephemeral=True)
 
                 # System log (non-ephemeral post to #mod-log via your logger)
-                details = f"{interaction.user.mention} → {user.mention}"
+                details = f"{actor.mention} → {user.mention}"
                 if reason:
                     details += f"\nReason: {reason}"
-                await bot.logger.log_system_event(
-                    interaction.guild, log_title, details, "success"
-                )
+                _bg(log(guild, log_title, details, "success"))
 
             else:  # remove
-                res = await wl_remove(str(interaction.guild_id), str(user.id))
+                res = await wl_remove(gid, str(user.id))
                 if res["removed"]:
                     msg = f"✅ Removed {user.mention} from whitelist."
                     log_title = "Whitelist Removed"
@@ -169,133 +342,106 @@ def setup_commands(tree: app_commands.CommandTree, bot: 'ModerationBot'):
                     msg = f"ℹ️ {user.mention} was not on the whitelist."
                     log_title = "Whitelist Not Found"
 
-                await interaction.response.send_message(msg, ephemeral=True)
+                await interaction.followup.send(msg, ephemeral=True)
 
-                await bot.logger.log_system_event(
-                    interaction.guild, log_title,
-                    f"{interaction.user.mention} → {user.mention}"
-                )
+                _bg(log(guild, log_title, f"{actor.mention} → {user.mention}"))
 
         except Exception as e:
-            # If we haven’t responded yet, send an error; otherwise use followup
-            if not interaction.response.is_done():
-                await interaction.response.send_message(f"❌ DB error: {e}", ephemeral=True)
-            else:
-                await interaction.followup.send(f"❌ DB error: {e}", ephemeral=True)
+            await interaction.followup.send(f"❌ DB error: {e}", ephemeral=True)
 
 
     @tree.command(name="user_strikes", description="Check the current strike count for a user")
+    @app_commands.checks.has_permissions(manage_messages=True)
+    @defer_ephemeral
     async def user_strikes_cmd(interaction: discord.Interaction, user: discord.User):
-        if not interaction.user.guild_permissions.manage_messages:
-            return await interaction.response.send_message(
-                "❌ Manage Messages permission required.", ephemeral=True
-            )
         try:
             row = await strike_get(str(interaction.guild_id), str(user.id))
-            cnt = int(row["count"]) if row else 0
-            reset_at = int(row["reset_at"]) if row else None
+            if row:
+                cnt = int(row["count"])
+                resets = f"<t:{int(row['reset_at'])}:R>" if row["reset_at"] else "—"
+            else:
+                # No record: nothing to convert or format
+                cnt, resets = 0, "—"
 
             embed = discord.Embed(
                 title=f"📊 Strike Report: {user.display_name}",
-                color=discord.Color.orange() if cnt > 0 else discord.Color.green()
+                color=_COL_ORANGE if cnt > 0 else _COL_GREEN
             )
             embed.add_field(name="Current Strikes", value=str(cnt), inline=True)
-            if reset_at:
-                embed.add_field(name="Window Resets", value=f"<t:{reset_at}:R>", inline=True)
-            else:
-                embed.add_field(name="Window Resets", value="—", inline=True)
+            embed.add_field(name="Window Resets", value=resets, inline=True)
 
             if user.avatar:
                 embed.set_thumbnail(url=user.avatar.url)
 
-            await interaction.response.send_message(embed=embed, ephemeral=True)
+            await interaction.followup.send(embed=embed, ephemeral=True)
         except Exception as e:
-            await interaction.response.send_message(f"❌ DB error: {e}", ephemeral=True)
+            await interaction.followup.send(f"❌ DB error: {e}", ephemeral=True)
 
     @tree.command(name="clear_strikes", description="Clear all strikes for a user")
+    @app_commands.checks.has_permissions(manage_guild=True)
+    @defer_ephemeral
     async def clear_strikes_cmd(interaction: discord.Interaction, user: discord.User):
-        if not interaction.user.guild_permissions.manage_guild:
-            return await interaction.response.send_message(
-                "❌ Administrator permissions required.", ephemeral=True
-            )
-        # Clear from DB
+        # Clear from DB first; the timeout is only lifted once the strikes are really gone
+        guild = interaction.guild
         try:
-            await strike_clear(str(interaction.guild_id), str(user.id))
+            await strike_clear(str(guild.id), str(user.id))
         except Exception as e:
-            return await interaction.response.send_message(f"❌ DB error: {e}", ephemeral=True)
-
-        # Try to remove any active timeout
-        removed_timeout_note = ""
-        member = interaction.guild.get_member(user.id)
-        if member and member.communication_disabled_until:
-            try:
-                await member.edit(timed_out_until=None, reason="Strikes cleared")
-                removed_timeout_note = "\nAlso removed active timeout."
-            except discord.Forbidden:
-                removed_timeout_note = "\n⚠️ Missing permission to remove timeout."
-            except discord.HTTPException as e:
-                removed_timeout_note = f"\n⚠️ Failed to remove timeout: {e}"
-
-        await interaction.response.send_message(
+            return await interaction.followup.send(f"❌ DB error: {e}", ephemeral=True)
+
+        removed_timeout_note = await _maybe_remove_timeout(guild.get_member(user.id))
+
+        await interaction.followup.send(
             f"✅ Cleared all strikes for {user.mention}.{removed_timeout_note}",
             ephemeral=True
         )
 
-        await bot.logger.log_system_event(
-            interaction.guild, "Strikes Cleared",
+        _bg(bot.logger.log_system_event(
+            guild, "Strikes Cleared",
             f"{interaction.user.mention} cleared strikes for {user.mention}"
-        )
+        ))
 
     @tree.command(name="test_message", description="Test message classification (Admin only)")
+    @app_commands.checks.has_permissions(manage_guild=True)
+    @defer_ephemeral
     async def test_message(interaction: discord.Interaction, text: str):
-        if not interaction.user.guild_permissions.manage_guild:
-            return await interaction.response.send_message(
-                "❌ Administrator permissions required.", ephemeral=True
-            )
-        await interaction.response.defer(ephemeral=True)
-
-        level, reason, analysis = await bot.classifier.classify_message(text, interaction.user.id)
+        level, reason, analysis = await bot.classifier.classify_message(
+            text, interaction.user.id, interaction.guild_id,
+            apis_enabled=_APIS_ENABLED, dry_run=True
+        )
 
         embed = discord.Embed(
             title="🧪 Message Classification Test",
-            color=bot.logger.color_map.get(level, discord.Color.gray())
+            color=bot.logger.color_map.get(level, _COL_GRAY)
         )
         embed.add_field(name="Test Message", value=f"```{text[:500]}```", inline=False)
         embed.add_field(name="Classification", value=level.title(), inline=True)
         embed.add_field(name="Reason", value=reason, inline=True)
 
         if analysis:
-            perspective_score = analysis.get("perspective", {}).get("score", 0)
-            openai_flagged = analysis.get("openai", {}).get("flagged", False)
+            perspective_block = analysis.get("perspective") or {}
+            openai_block = analysis.get("openai") or {}
+            perspective_score = perspective_block.get("score", 0)
             analysis_text = []
             if perspective_score:
                 analysis_text.append(f"**Perspective:** {perspective_score:.3f}")
-            if openai_flagged:
-                cats = [k for k, v in analysis.get("openai", {}).get("categories", {}).items() if v]
+            if openai_block.get("flagged", False):
+                cats = [k for k, v in openai_block.get("categories", {}).items() if v][:3]
                 if cats:
-                    analysis_text.append(f"**OpenAI:** {', '.join(cats[:3])}")
+                    analysis_text.append(f"**OpenAI:** {', '.join(cats)}")
             if analysis_text:
                 embed.add_field(name="AI Analysis", value="\n".join(analysis_text), inline=False)
 
         await interaction.followup.send(embed=embed, ephemeral=True)
 
     @tree.command(name="cleanup_strikes", description="Clean up expired strike records")
+    @app_commands.checks.has_permissions(manage_guild=True)
+    @defer_ephemeral
     async def cleanup_strikes(interaction: discord.Interaction):
-        if not interaction.user.guild_permissions.manage_guild:
-            return await interaction.response.send_message(
-                "❌ Administrator permissions required.", ephemeral=True
-            )
-        
-        await interaction.response.defer(ephemeral=True)
-        
-        # Import the cleanup function from your strikes repo
-        from data.strikes_repo import cleanup_expired_strikes
-        
-        cleaned = await cleanup_expired_strikes(str(interaction.guild.id))
+        cleaned = await _queued_cleanup(str(interaction.guild.id))
         
         embed = discord.Embed(
             title="🧹 Strike Cleanup Complete",
-            color=discord.Color.green()
+            color=_COL_GREEN
         )
         
         if cleaned > 0:
@@ -315,70 +461,50 @@ def setup_commands(tree: app_commands.CommandTree, bot: 'ModerationBot'):
         
         await interaction.followup.send(embed=embed, ephemeral=True)
         
-        # Log the cleanup
-        try:
-            await bot.logger.log_system_event(
-                interaction.guild, "Strike Cleanup",
-                f"{interaction.user.mention} cleaned up {cleaned} expired strike records",
-                "info"
-            )
-        except Exception as e:
-            print(f"Error logging cleanup: {e}")
+        # Log the cleanup (failures are reported by _bg_done)
+        _bg(bot.logger.log_system_event(
+            interaction.guild, "Strike Cleanup",
+            f"{interaction.user.mention} cleaned up {cleaned} expired strike records",
+            "info"
+        ))
 
     @tree.command(name="bot_info", description="Show bot information and diagnostics")
+    @defer_ephemeral
     async def bot_info(interaction: discord.Interaction):
-        embed = discord.Embed(
-            title="🤖 ModBot Information",
-            color=discord.Color.blue(),
-            timestamp=datetime.now(timezone.utc)
-        )
-
         # Bot stats
-        embed.add_field(
-            name="Bot Status",
-            value=f"**Latency:** {bot.client.latency*1000:.0f}ms\n**Guilds:** {len(bot.client.guilds)}",
-            inline=True
-        )
+        values = [
+            f"**Latency:** {bot.client.latency*1000:.0f}ms\n**Guilds:** {len(bot.client.guilds)}"
+        ]
 
         # Moderation
         total_moderated = len(bot.moderated_channels)
         try:
-            wl_cnt = await wl_count(str(interaction.guild_id))
+            wl_cnt = await cached_wl_count(str(interaction.guild_id))
         except Exception:
             wl_cnt = "—"
-        embed.add_field(
-            name="Moderation",
-            value=f"**Channels:** {total_moderated}\n**Whitelist:** {wl_cnt}",
-            inline=True
-        )
+        values.append(f"**Channels:** {total_moderated}\n**Whitelist:** {wl_cnt}")
 
         # API status
-        from config.settings import PERSPECTIVE_API_KEY, OPENAI_API_KEY
-        api_status = []
-        api_status.append("✅ Perspective API" if PERSPECTIVE_API_KEY else "❌ Perspective API")
-        api_status.append("✅ OpenAI API" if OPENAI_API_KEY else "❌ OpenAI API")
-        embed.add_field(name="AI Services", value="\n".join(api_status), inline=True)
+        values.append(_API_STATUS_VALUE)
 
         # Permission check for current channel
         if interaction.guild:
             me = interaction.guild.me
-            perms = interaction.channel.permissions_for(me)
+            perms = channel_perms(interaction.channel, me)
             perm_status = []
             perm_status.append(f"{'✅' if perms.manage_messages else '❌'} Manage Messages")
             perm_status.append(f"{'✅' if perms.moderate_members else '❌'} Moderate Members")
             perm_status.append(f"{'✅' if perms.kick_members else '❌'} Kick Members")
             perm_status.append(f"{'✅' if perms.manage_channels else '❌'} Manage Channels")
-            embed.add_field(name="Permissions", value="\n".join(perm_status), inline=False)
+            values.append("\n".join(perm_status))
 
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        embed = _embed_from_template(_BOT_INFO_TEMPLATE, *values)
+        await interaction.followup.send(embed=embed, ephemeral=True)
 
     @tree.command(name="user_immunity", description="Check user's immunity status and positive points")
+    @app_commands.checks.has_permissions(manage_messages=True)
+    @defer_ephemeral
     async def user_immunity(interaction: discord.Interaction, user: discord.User = None):
-        if not interaction.user.guild_permissions.manage_messages:
-            return await interaction.response.send_message(
-                "❌ Manage Messages permission required.", ephemeral=True
-            )
-        
         target_user = user or interaction.user
         immunity = await get_user_immunity(str(interaction.guild.id), str(target_user.id))
         
@@ -388,16 +514,9 @@ def setup_commands(tree: app_commands.CommandTree, bot: 'ModerationBot'):
         )
         
         # Immunity level with emoji
-        level_emojis = {
-            "none": "⚪ None",
-            "trusted": "🟢 Trusted Member", 
-            "veteran": "🔵 Veteran Guardian",
-            "guardian": "🟣 Community Guardian"
-        }
-        
         embed.add_field(
             name="Immunity Level", 
-            value=level_emojis.get(immunity["immunity_level"], "❓ Unknown"),
+            value=_IMMUNITY_LEVEL_LABELS.get(immunity["immunity_level"], "❓ Unknown"),
             inline=True
         )
         
@@ -453,47 +572,41 @@ def setup_commands(tree: app_commands.CommandTree, bot: 'ModerationBot'):
         if target_user.avatar:
             embed.set_thumbnail(url=target_user.avatar.url)
         
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        await interaction.followup.send(embed=embed, ephemeral=True)
 
     @tree.command(name="immunity_leaderboard", description="Show top community members by positive points")
+    @defer_ephemeral
     async def immunity_leaderboard(interaction: discord.Interaction, limit: int = 10):
         if limit > 20:
             limit = 20
-        
+
         leaderboard = await get_immunity_leaderboard(str(interaction.guild.id), limit)
         
         if not leaderboard:
             embed = discord.Embed(
                 title="🏆 Community Immunity Leaderboard",
                 description="No positive points recorded yet!",
-                color=discord.Color.blue()
+                color=_COL_BLUE
             )
-            return await interaction.response.send_message(embed=embed, ephemeral=True)
+            return await interaction.followup.send(embed=embed, ephemeral=True)
         
         embed = discord.Embed(
             title="🏆 Community Immunity Leaderboard", 
             description=f"Top {len(leaderboard)} members by positive behavior",
-            color=discord.Color.gold()
+            color=_COL_GOLD
         )
         
+        get_member = interaction.guild.get_member
         leaderboard_text = []
         for i, entry in enumerate(leaderboard, 1):
-            user = interaction.guild.get_member(int(entry["user_id"]))
-            name = user.display_name if user else f"User {entry['user_id']}"
-            
-            level_emoji = {
-                "guardian": "🟣",
-                "veteran": "🔵", 
-                "trusted": "🟢",
-                "none": "⚪"
-            }.get(entry["immunity_level"], "❓")
-            
-            points = entry["positive_points"]
-            strikes = entry["count"] or 0
+            uid = entry["user_id_int"]
+            user = get_member(uid)
+            name = user.display_name if user else f"User {uid}"
+            level_emoji = _IMMUNITY_LEVEL_EMOJI.get(entry["immunity_level"], "❓")
             
             leaderboard_text.append(
                 f"**{i}.** {level_emoji} {name}\n"
-                f"     💎 {points:,} points • ⚠️ {strikes} strikes"
+                f"     💎 {entry['positive_points']:,} points • ⚠️ {entry['count'] or 0} strikes"
             )
         
         embed.add_field(
@@ -504,33 +617,30 @@ def setup_commands(tree: app_commands.CommandTree, bot: 'ModerationBot'):
         
         embed.set_footer(text="Earn points through positive behavior!")
         
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        await interaction.followup.send(embed=embed, ephemeral=True)
 
     @tree.command(name="award_points", description="Manually award positive points to a user")
+    @app_commands.checks.has_permissions(manage_guild=True)
+    @defer_ephemeral
     async def award_points(interaction: discord.Interaction, user: discord.User, points: int, reason: str = None):
-        if not interaction.user.guild_permissions.manage_guild:
-            return await interaction.response.send_message(
-                "❌ Administrator permissions required.", ephemeral=True
-            )
-        
         if points < 1 or points > 100:
-            return await interaction.response.send_message(
+            return await interaction.followup.send(
                 "❌ Points must be between 1 and 100.", ephemeral=True
             )
-        
-        await add_positive_points(
-            str(interaction.guild.id), 
+
+        guild, actor = interaction.guild, interaction.user
+
+        # Award and read back the updated immunity status in one query
+        immunity = await add_positive_points_returning(
+            str(guild.id), 
             str(user.id), 
             points, 
-            reason or f"Manual award by {interaction.user.display_name}"
+            reason or f"Manual award by {actor.display_name}"
         )
         
-        # Get updated immunity status
-        immunity = await get_user_immunity(str(interaction.guild.id), str(user.id))
-        
         embed = discord.Embed(
             title="✨ Positive Points Awarded!",
-            color=discord.Color.green()
+            color=_COL_GREEN
         )
         
         embed.add_field(name="User", value=user.mention, inline=True)
@@ -541,56 +651,47 @@ def setup_commands(tree: app_commands.CommandTree, bot: 'ModerationBot'):
             embed.add_field(name="Reason", value=reason, inline=False)
         
         # Show if they gained immunity level
-        level_emojis = {
-            "trusted": "🟢 Trusted Member",
-            "veteran": "🔵 Veteran Guardian", 
-            "guardian": "🟣 Community Guardian"
-        }
-        
         if immunity["immunity_level"] != "none":
             embed.add_field(
                 name="🛡️ Immunity Level",
-                value=level_emojis.get(immunity["immunity_level"], immunity["immunity_level"]),
+                value=_IMMUNITY_LEVEL_LABELS.get(immunity["immunity_level"], immunity["immunity_level"]),
                 inline=False
             )
         
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        await interaction.followup.send(embed=embed, ephemeral=True)
         
         # Log the manual award
-        await bot.logger.log_system_event(
-            interaction.guild, "Manual Points Award",
-            f"{interaction.user.mention} awarded {points} points to {user.mention}. Reason: {reason or 'No reason given'}",
+        _bg(bot.logger.log_system_event(
+            guild, "Manual Points Award",
+            f"{actor.mention} awarded {points} points to {user.mention}. Reason: {reason or 'No reason given'}",
             "success"
-        )
+        ))
 
     @tree.command(name="weekly_bonus", description="Award weekly bonuses to well-behaved users")
+    @app_commands.checks.has_permissions(manage_guild=True)
+    @defer_ephemeral
     async def weekly_bonus(interaction: discord.Interaction):
-        if not interaction.user.guild_permissions.manage_guild:
-            return await interaction.response.send_message(
-                "❌ Administrator permissions required.", ephemeral=True
-            )
-        
-        await interaction.response.defer(ephemeral=True)
-        
-        awarded_users = await process_weekly_bonus(str(interaction.guild.id))
+        guild = interaction.guild
+        awarded_users = await process_weekly_bonus(str(guild.id))
         
         if not awarded_users:
             embed = discord.Embed(
                 title="📅 Weekly Bonus Check",
                 description="No users qualified for weekly bonuses at this time.",
-                color=discord.Color.blue()
+                color=_COL_BLUE
             )
             return await interaction.followup.send(embed=embed, ephemeral=True)
         
         embed = discord.Embed(
             title="🎉 Weekly Bonuses Awarded!",
             description=f"Awarded bonuses to {len(awarded_users)} well-behaved members",
-            color=discord.Color.green()
+            color=_COL_GREEN
         )
         
+        get_member = guild.get_member
         bonus_text = []
         for award in awarded_users[:10]:  # Show max 10
-            user = interaction.guild.get_member(int(award["user_id"]))
+            user = get_member(int(award["user_id"]))
             name = user.display_name if user else f"User {award['user_id']}"
             
             bonus_text.append(
@@ -615,16 +716,13 @@ def setup_commands(tree: app_commands.CommandTree, bot: 'ModerationBot'):
         
         await interaction.followup.send(embed=embed, ephemeral=True)
         
-        # Also send a summary to mod log if configured
-        try:
-            summary = f"🎉 **Weekly Bonus Round Complete**\n"
-            summary += f"• **{len(awarded_users)} members** received bonuses\n" 
-            summary += f"• **Total points awarded:** {sum(a['points_awarded'] for a in awarded_users):,}\n"
-            summary += f"• **Processed by:** {interaction.user.mention}"
-            
-            await bot.logger.log_system_event(
-                interaction.guild, "Weekly Bonuses Awarded",
-                summary, "success"
-            )
-        except Exception as e:
-            print(f"Error logging weekly bonus: {e}")
+        # Also send a summary to mod log if configured (failures are reported by _bg_done)
+        summary = f"🎉 **Weekly Bonus Round Complete**\n"
+        summary += f"• **{len(awarded_users)} members** received bonuses\n" 
+        summary += f"• **Total points awarded:** {sum(a['points_awarded'] for a in awarded_users):,}\n"
+        summary += f"• **Processed by:** {interaction.user.mention}"
+        
+        _bg(bot.logger.log_system_event(
+            guild, "Weekly Bonuses Awarded",
+            summary, "success"
+        ))
@@ -3,6 +3,8 @@ Configuration settings for the Discord Moderation Bot
 """
 
 import os
+import re
+from types import MappingProxyType
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -17,36 +19,52 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
 #Databae URL
 DATABASE_URL = os.getenv("DATABASE_URL")
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "5"))
+# Write + read pool maxima together stay at the old single-pool ceiling of 20 per process
+# (plus the whitelist LISTEN connection); raise them only if the server's max_connections allows
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "15"))
+# Separate pool for the per-message reads (whitelist, immunity); 0 shares the main pool
+DB_READ_POOL_MAX_SIZE = int(os.getenv("DB_READ_POOL_MAX_SIZE", "5"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "1024"))
+DB_MAX_INACTIVE_CONN_SEC = float(os.getenv("DB_MAX_INACTIVE_CONN_SEC", "300"))
 
 # Moderation Settings
 MOD_FLAG = "[modbot]"
 STRIKE_WINDOW_MINUTES = 60
+STRIKE_WINDOW_SEC = STRIKE_WINDOW_MINUTES * 60
 MAX_MESSAGE_LENGTH = 2000
+MIN_CLASSIFY_LEN = 3  # Shorter messages can't trip any check; skip the classifier
 
-# Toxicity Thresholds
-TOXICITY_THRESHOLDS = {
+# Toxicity Thresholds (read-only; shared by every message handler)
+TOXICITY_THRESHOLDS = MappingProxyType({
     "severe": 0.8,    # Immediate timeout/kick
     "moderate": 0.6,  # Delete + warn
     "mild": 0.4       # Warning only
-}
+})
 
-# Strike Escalation
-STRIKE_ESCALATION = {
-    1: {"action": "warn", "duration": 0},
-    2: {"action": "timeout", "duration": 15},  # 15 minutes
-    3: {"action": "timeout", "duration": 60},  # 1 hour
-    4: {"action": "timeout", "duration": 240}, # 4 hours
-    5: {"action": "kick", "duration": 0}
-}
+# Strike Escalation: (strike count, action, duration in minutes), one entry per count from 1
+STRIKE_ESCALATION = (
+    (1, "warn", 0),
+    (2, "timeout", 15),   # 15 minutes
+    (3, "timeout", 60),   # 1 hour
+    (4, "timeout", 240),  # 4 hours
+    (5, "kick", 0)
+)
+
+def escalation_for(strike_count: int):
+    """The STRIKE_ESCALATION entry for this strike count, or None if it has no fixed rule"""
+    if 1 <= strike_count <= len(STRIKE_ESCALATION):
+        return STRIKE_ESCALATION[strike_count - 1]
+    return None
 
 # Punishment Durations (minutes)
-PUNISHMENT_DURATIONS = {
+PUNISHMENT_DURATIONS = MappingProxyType({
     "warn": 0,
     "mild_timeout": 15,
     "moderate_timeout": 60,
     "severe_timeout": 240,
     "kick": 0
-}
+})
 
 # Fallback Patterns (when APIs fail)
 FALLBACK_PATTERNS = {
@@ -61,6 +79,29 @@ FALLBACK_PATTERNS = {
     ]
 }
 
+# Optional: google-re2 matches in linear time without backtracking. It can't do lookaheads,
+# so levels that use them stay on the stdlib engine
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+def _compile_fallback_level(patterns):
+    combined = "|".join(f"(?:{pattern})" for pattern in patterns)
+    if re2 is not None:
+        try:
+            return re2.compile(f"(?i){combined}")
+        except Exception:
+            pass
+    return re.compile(combined, re.IGNORECASE)
+
+# Compiled once at import into one alternation per level, so a level is a single
+# scan over the text however many patterns it holds
+FALLBACK_PATTERNS_COMPILED = {
+    level: _compile_fallback_level(patterns)
+    for level, patterns in FALLBACK_PATTERNS.items()
+}
+
 # Add these to your existing config/settings.py file
 
 # Community Immunity System Settings
@@ -1,17 +1,42 @@
-import asyncpg, os
-from config.settings import DATABASE_URL
+import asyncpg
+from config.settings import (
+    DATABASE_URL, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_READ_POOL_MAX_SIZE,
+    DB_STATEMENT_CACHE_SIZE, DB_MAX_INACTIVE_CONN_SEC
+)
 _POOL = None
+_READ_POOL = None
+
+async def _create_pool(url: str, min_size: int, max_size: int):
+    # Repo helpers always go through pool().acquire() with fixed parametrized SQL,
+    # so each warm connection's prepared-statement cache serves the hot queries
+    return await asyncpg.create_pool(
+        dsn=url,
+        min_size=min_size,
+        max_size=max_size,
+        command_timeout=5,
+        statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+        max_inactive_connection_lifetime=DB_MAX_INACTIVE_CONN_SEC,
+    )
 
 async def init_pool():
-    global _POOL
+    global _POOL, _READ_POOL
     if _POOL is None:
         url = DATABASE_URL
         if not url:
             raise RuntimeError("DATABASE_URL not set")
-        _POOL = await asyncpg.create_pool(dsn=url, min_size=1, max_size=5, command_timeout=5)
+        # create_pool opens min_size connections up front, so both pools start warm
+        _POOL = await _create_pool(url, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE)
+        if DB_READ_POOL_MAX_SIZE > 0:
+            _READ_POOL = await _create_pool(
+                url, min(DB_POOL_MIN_SIZE, DB_READ_POOL_MAX_SIZE), DB_READ_POOL_MAX_SIZE
+            )
     return _POOL
 
 def pool():
     if _POOL is None:
         raise RuntimeError("DB pool not initialized. Call init_pool() in on_ready().")
     return _POOL
+
+def read_pool():
+    """Pool for hot per-message reads, so their fan-out can't starve moderation writes"""
+    return _READ_POOL or pool()
@@ -1,126 +1,183 @@
+import asyncio
+import bisect
 import time
-from .db import pool
+from config.settings import IMMUNITY_THRESHOLDS, POINT_VALUES
+from utils.logging import log
+from .db import pool, read_pool
 
 def _now(): return int(time.time())
 
-# Immunity system constants
-IMMUNITY_THRESHOLDS = {
-    "trusted": 100,    # Immune to warnings (0.4-0.6)
-    "veteran": 500,    # Immune to minor flags (0.6-0.7)  
-    "guardian": 1000   # Only severe violations (0.8+)
-}
-
-POINT_VALUES = {
-    "clean_message": 1,      # Per message with toxicity < 0.1
-    "helpful_reaction": 3,   # Per helpful reaction given
-    "quality_message": 5,    # Long message (>50 chars) with 0.0 toxicity
-    "weekly_bonus": 50,      # 7 days without violations
-    "strike_penalty": -10    # Per strike received
-}
+# guild_id -> (guild_stats result, monotonic expiry); strikes move fast, so keep this short
+GUILD_STATS_CACHE_TTL_SEC = 10
+_guild_stats_cache: dict[str, tuple[dict, float]] = {}
+
+# Clean-message points are summed per user here and written in one batch per flush
+POINTS_FLUSH_DELAY = 0.5
+_pending_points: dict[tuple[str, str], int] = {}
+_points_flush_tasks: set[asyncio.Task] = set()
+
+# Immunity tiers in ascending threshold order; both level and next-threshold lookups bisect these
+_TIER_NAMES, _TIER_VALUES = zip(*sorted(IMMUNITY_THRESHOLDS.items(), key=lambda kv: kv[1]))
+
+def _immunity_level_sql(points: str, count: str) -> str:
+    """SQL CASE equivalent of _calculate_immunity_level over the given expressions"""
+    return f"""CASE WHEN {count} >= 3 THEN 'none'
+                    WHEN {points} >= {IMMUNITY_THRESHOLDS["guardian"]} THEN 'guardian'
+                    WHEN {points} >= {IMMUNITY_THRESHOLDS["veteran"]} THEN 'veteran'
+                    WHEN {points} >= {IMMUNITY_THRESHOLDS["trusted"]} THEN 'trusted'
+                    ELSE 'none' END"""
+
+# add_positive_points as one upsert; $1 guild, $2 user, $3 now, $4 points
+_ADD_POINTS_SQL = f"""
+  INSERT INTO strikes (guild_id,user_id,count,reset_at,updated_at,positive_points,immunity_level,last_positive_update)
+  VALUES ($1,$2,0,$3 + 3600,$3,$4,{_immunity_level_sql("$4::int", "0")},$3)
+  ON CONFLICT (guild_id,user_id) DO UPDATE
+    SET positive_points = COALESCE(strikes.positive_points, 0) + $4,
+        immunity_level = {_immunity_level_sql("COALESCE(strikes.positive_points, 0) + $4", "strikes.count")},
+        last_positive_update = EXCLUDED.last_positive_update, updated_at = EXCLUDED.updated_at
+  RETURNING count, positive_points, immunity_level
+"""
+
+# process_weekly_bonus: select, award and re-level eligible rows in one statement.
+# $1 guild, $2 week_ago, $3 no-bonus-since cutoff, $4 now
+_WEEKLY_BONUS_SQL = f"""
+    UPDATE strikes
+    SET positive_points = COALESCE(positive_points, 0) + {POINT_VALUES["weekly_bonus"]},
+        immunity_level = {_immunity_level_sql(f"COALESCE(positive_points, 0) + {POINT_VALUES['weekly_bonus']}", "0")},
+        last_positive_update = $4
+    WHERE guild_id = $1 
+      AND (updated_at < $2 OR count = 0)
+      AND (last_positive_update < $3 OR last_positive_update IS NULL)
+    RETURNING user_id, positive_points, immunity_level
+"""
 
 async def strike_bump(guild_id: str, user_id: str, window_sec: int, severity: str = "warn") -> tuple[int, int]:
-    """Enhanced strike bump that also handles immunity penalties"""
+    """Enhanced strike bump that also handles immunity penalties (a batch of one)"""
+    return (await strike_bump_many([(guild_id, user_id)], window_sec, severity))[0]
+
+async def strike_bump_many(bumps: list[tuple[str, str]], window_sec: int,
+                           severity: str = "warn") -> list[tuple[int, int]]:
+    """
+    Apply several strike bumps in one round trip per phase (claim, read, then upsert).
+    Bumps for the same user are applied in order, exactly as repeated strike_bump calls would.
+    Returns one (count, reset_at) per input bump, in input order.
+    """
+    if not bumps:
+        return []
     now = _now()
+    keys = list(dict.fromkeys(bumps))
+    # Rows are claimed and locked in key order, so concurrent batches can't deadlock
+    guild_ids, user_ids = map(list, zip(*sorted(keys)))
     async with pool().acquire() as con:
-        row = await con.fetchrow(
-            "SELECT count, reset_at, positive_points, immunity_level FROM strikes WHERE guild_id=$1 AND user_id=$2", 
-            guild_id, user_id
-        )
-        
-        if (not row) or (now > row["reset_at"]):
-            count, reset_at = 1, now + window_sec
-            # Preserve positive points but reset immunity if severe violation
-            positive_points = row["positive_points"] if row else 0
-            if severity == "severe":
-                positive_points = max(0, positive_points - 100)  # Severe penalty
-        else:
-            count, reset_at = row["count"] + 1, row["reset_at"]
-            positive_points = row["positive_points"] if row else 0
-            
-        # Apply strike penalty to positive points
-        positive_points = max(0, positive_points + POINT_VALUES["strike_penalty"])
-        
-        # Recalculate immunity level
-        immunity_level = _calculate_immunity_level(positive_points, count)
-        
-        await con.execute("""
-          INSERT INTO strikes (guild_id,user_id,count,reset_at,updated_at,positive_points,immunity_level)
-          VALUES ($1,$2,$3,$4,$5,$6,$7)
-          ON CONFLICT (guild_id,user_id) DO UPDATE
-            SET count=EXCLUDED.count, reset_at=EXCLUDED.reset_at, updated_at=EXCLUDED.updated_at,
-                positive_points=EXCLUDED.positive_points, immunity_level=EXCLUDED.immunity_level
-        """, guild_id, user_id, count, reset_at, now, positive_points, immunity_level)
-    
-    return count, reset_at
+        async with con.transaction():
+            # FOR UPDATE only locks rows that exist, so first make sure every key has one.
+            # The placeholder (count 0, reset_at 0) reads as "no strikes yet" below; without it
+            # two processes could both see no row and one first strike would be lost
+            await con.execute("""
+                INSERT INTO strikes (guild_id,user_id,count,reset_at,updated_at,positive_points,immunity_level)
+                SELECT k.guild_id, k.user_id, 0, 0, $3, 0, 'none'
+                FROM unnest($1::text[], $2::text[]) AS k(guild_id, user_id)
+                ORDER BY k.guild_id, k.user_id
+                ON CONFLICT (guild_id,user_id) DO NOTHING
+            """, guild_ids, user_ids, now)
+            rows = await con.fetch("""
+                SELECT s.guild_id, s.user_id, s.count, s.reset_at, s.positive_points
+                FROM strikes s
+                JOIN unnest($1::text[], $2::text[]) AS k(guild_id, user_id)
+                  USING (guild_id, user_id)
+                ORDER BY s.guild_id, s.user_id
+                FOR UPDATE OF s
+            """, guild_ids, user_ids)
+            state = {
+                (r["guild_id"], r["user_id"]): [r["count"], r["reset_at"], r["positive_points"] or 0]
+                for r in rows
+            }
+
+            results = []
+            for key in bumps:
+                cur = state.get(key)
+                if (not cur) or (now > cur[1]):
+                    positive_points = cur[2] if cur else 0
+                    if severity == "severe":
+                        positive_points = max(0, positive_points - 100)  # Severe penalty
+                    cur = [1, now + window_sec, positive_points]
+                else:
+                    cur[0] += 1
+                cur[2] = max(0, cur[2] + POINT_VALUES["strike_penalty"])
+                state[key] = cur
+                results.append((cur[0], cur[1]))
+
+            records = []
+            for guild_id, user_id in keys:
+                count, reset_at, positive_points = state[(guild_id, user_id)]
+                immunity_level = _calculate_immunity_level(positive_points, count)
+                records.append((guild_id, user_id, count, reset_at, now, positive_points, immunity_level))
+
+            await con.executemany("""
+              INSERT INTO strikes (guild_id,user_id,count,reset_at,updated_at,positive_points,immunity_level)
+              VALUES ($1,$2,$3,$4,$5,$6,$7)
+              ON CONFLICT (guild_id,user_id) DO UPDATE
+                SET count=EXCLUDED.count, reset_at=EXCLUDED.reset_at, updated_at=EXCLUDED.updated_at,
+                    positive_points=EXCLUDED.positive_points, immunity_level=EXCLUDED.immunity_level
+            """, records)
+
+    return results
 
 async def add_positive_points(guild_id: str, user_id: str, points: int, reason: str = "good_behavior"):
     """Add positive points for good behavior"""
-    now = _now()
     async with pool().acquire() as con:
-        # Get current data
-        row = await con.fetchrow(
-            "SELECT count, positive_points, last_positive_update FROM strikes WHERE guild_id=$1 AND user_id=$2",
-            guild_id, user_id
-        )
-        
-        if row:
-            current_points = row["positive_points"] + points
-            current_count = row["count"]
-        else:
-            current_points = points
-            current_count = 0
-            
-        # Calculate new immunity level
-        immunity_level = _calculate_immunity_level(current_points, current_count)
-        
-        await con.execute("""
-          INSERT INTO strikes (guild_id,user_id,count,reset_at,updated_at,positive_points,immunity_level,last_positive_update)
-          VALUES ($1,$2,$3,$4,$5,$6,$7,$8)
-          ON CONFLICT (guild_id,user_id) DO UPDATE
-            SET positive_points=EXCLUDED.positive_points, immunity_level=EXCLUDED.immunity_level,
-                last_positive_update=EXCLUDED.last_positive_update, updated_at=EXCLUDED.updated_at
-        """, guild_id, user_id, current_count, now + 3600, now, current_points, immunity_level, now)
+        await con.execute(_ADD_POINTS_SQL, guild_id, user_id, _now(), points)
+
+async def add_positive_points_returning(guild_id: str, user_id: str, points: int,
+                                       reason: str = "good_behavior") -> dict:
+    """
+    add_positive_points that also hands back the updated immunity status
+    (same shape as get_user_immunity) from the same upsert.
+    """
+    async with pool().acquire() as con:
+        row = await con.fetchrow(_ADD_POINTS_SQL, guild_id, user_id, _now(), points)
+    return _immunity_snapshot(row["immunity_level"], row["positive_points"], row["count"] or 0)
 
 async def get_user_immunity(guild_id: str, user_id: str) -> dict:
     """Get user's current immunity status and points"""
-    async with pool().acquire() as con:
+    async with read_pool().acquire() as con:
         row = await con.fetchrow(
             "SELECT count, positive_points, immunity_level, last_positive_update FROM strikes WHERE guild_id=$1 AND user_id=$2",
             guild_id, user_id
         )
         
         if not row:
-            return {
-                "immunity_level": "none",
-                "positive_points": 0,
-                "strikes": 0,
-                "next_threshold": IMMUNITY_THRESHOLDS["trusted"],
-                "can_bypass_warnings": False,
-                "can_bypass_minor_flags": False,
-                "can_bypass_all_but_severe": False
-            }
+            return no_immunity()
         
-        immunity_level = row["immunity_level"] or "none"
-        points = row["positive_points"] or 0
-        
-        # Calculate next threshold
-        next_threshold = None
-        if points < IMMUNITY_THRESHOLDS["trusted"]:
-            next_threshold = IMMUNITY_THRESHOLDS["trusted"]
-        elif points < IMMUNITY_THRESHOLDS["veteran"]:
-            next_threshold = IMMUNITY_THRESHOLDS["veteran"]  
-        elif points < IMMUNITY_THRESHOLDS["guardian"]:
-            next_threshold = IMMUNITY_THRESHOLDS["guardian"]
-        
-        return {
-            "immunity_level": immunity_level,
-            "positive_points": points,
-            "strikes": row["count"] or 0,
-            "next_threshold": next_threshold,
-            "can_bypass_warnings": immunity_level in ["trusted", "veteran", "guardian"],
-            "can_bypass_minor_flags": immunity_level in ["veteran", "guardian"],
-            "can_bypass_all_but_severe": immunity_level == "guardian"
-        }
+        return _immunity_snapshot(row["immunity_level"] or "none", row["positive_points"] or 0, row["count"] or 0)
+
+def no_immunity() -> dict:
+    """Immunity status of a user with no strikes row (no points, no bypasses)"""
+    return {
+        "immunity_level": "none",
+        "positive_points": 0,
+        "strikes": 0,
+        "next_threshold": IMMUNITY_THRESHOLDS["trusted"],
+        "can_bypass_warnings": False,
+        "can_bypass_minor_flags": False,
+        "can_bypass_all_but_severe": False
+    }
+
+def _immunity_snapshot(immunity_level: str, points: int, strikes: int) -> dict:
+    """Shape a user's immunity status the way get_user_immunity reports it"""
+    # Next threshold: the lowest tier above the current points, if any
+    idx = bisect.bisect_right(_TIER_VALUES, points)
+    next_threshold = _TIER_VALUES[idx] if idx < len(_TIER_VALUES) else None
+    
+    return {
+        "immunity_level": immunity_level,
+        "positive_points": points,
+        "strikes": strikes,
+        "next_threshold": next_threshold,
+        "can_bypass_warnings": immunity_level in ["trusted", "veteran", "guardian"],
+        "can_bypass_minor_flags": immunity_level in ["veteran", "guardian"],
+        "can_bypass_all_but_severe": immunity_level == "guardian"
+    }
 
 async def process_clean_message(guild_id: str, user_id: str, message_text: str, toxicity_score: float):
     """Process a clean message for positive points"""
@@ -135,7 +192,37 @@ async def process_clean_message(guild_id: str, user_id: str, message_text: str,
         points += POINT_VALUES["quality_message"]
     
     if points > 0:
-        await add_positive_points(guild_id, user_id, points, "clean_message")
+        _queue_positive_points(guild_id, user_id, points)
+
+def _queue_positive_points(guild_id: str, user_id: str, points: int):
+    """Add points on the next batched flush instead of a write per message"""
+    if not _pending_points:
+        task = asyncio.get_running_loop().create_task(_flush_positive_points())
+        _points_flush_tasks.add(task)
+        task.add_done_callback(_points_flush_tasks.discard)
+    key = (guild_id, user_id)
+    _pending_points[key] = _pending_points.get(key, 0) + points
+
+async def _flush_positive_points():
+    await asyncio.sleep(POINTS_FLUSH_DELAY)
+    await _write_pending_points()
+
+async def flush_positive_points():
+    """Write queued points now and wait out scheduled flushes (call before shutdown)"""
+    await _write_pending_points()
+    await asyncio.gather(*_points_flush_tasks, return_exceptions=True)
+
+async def _write_pending_points():
+    if not _pending_points:
+        return
+    batch = dict(_pending_points)
+    _pending_points.clear()
+    now = _now()
+    try:
+        async with pool().acquire() as con:
+            await con.executemany(_ADD_POINTS_SQL, [(g, u, now, pts) for (g, u), pts in batch.items()])
+    except Exception as e:
+        log.error("Error flushing positive points for %d users: %s", len(batch), e)
 
 async def process_weekly_bonus(guild_id: str) -> list:
     """Award weekly bonuses to users with no violations in 7 days"""
@@ -143,47 +230,31 @@ async def process_weekly_bonus(guild_id: str) -> list:
     week_ago = now - (7 * 24 * 3600)
     
     async with pool().acquire() as con:
-        # Find users who haven't had strikes in the last 7 days
-        rows = await con.fetch("""
-            SELECT guild_id, user_id, positive_points
-            FROM strikes 
-            WHERE guild_id = $1 
-              AND (updated_at < $2 OR count = 0)
-              AND (last_positive_update < $3 OR last_positive_update IS NULL)
-        """, guild_id, week_ago, now - (6 * 24 * 3600))  # Don't give bonus too frequently
-        
-        awarded_users = []
-        for row in rows:
-            new_points = row["positive_points"] + POINT_VALUES["weekly_bonus"]
-            immunity_level = _calculate_immunity_level(new_points, 0)
-            
-            await con.execute("""
-                UPDATE strikes 
-                SET positive_points = $1, immunity_level = $2, last_positive_update = $3
-                WHERE guild_id = $4 AND user_id = $5
-            """, new_points, immunity_level, now, row["guild_id"], row["user_id"])
-            
-            awarded_users.append({
-                "user_id": row["user_id"],
-                "points_awarded": POINT_VALUES["weekly_bonus"],
-                "total_points": new_points,
-                "new_immunity": immunity_level
-            })
-        
-        return awarded_users
+        # Users who haven't had strikes in the last 7 days, updated server-side
+        rows = await con.fetch(
+            _WEEKLY_BONUS_SQL, guild_id, week_ago, now - (6 * 24 * 3600), now  # Don't give bonus too frequently
+        )
+    
+    return [{
+        "user_id": row["user_id"],
+        "points_awarded": POINT_VALUES["weekly_bonus"],
+        "total_points": row["positive_points"],
+        "new_immunity": row["immunity_level"]
+    } for row in rows]
 
 async def get_immunity_leaderboard(guild_id: str, limit: int = 10) -> list:
-    """Get top users by positive points"""
+    """Get top users by positive points (user_id_int is the Discord snowflake, cast in SQL)"""
     async with pool().acquire() as con:
         rows = await con.fetch("""
-            SELECT user_id, positive_points, immunity_level, count
+            SELECT user_id, user_id::bigint AS user_id_int, positive_points, immunity_level, count
             FROM strikes 
             WHERE guild_id = $1 AND positive_points > 0
             ORDER BY positive_points DESC
             LIMIT $2
         """, guild_id, limit)
         
-        return [dict(row) for row in rows]
+        # Records support key access, which is all callers need; no per-row dict copy
+        return rows
 
 def _calculate_immunity_level(positive_points: int, strike_count: int) -> str:
     """Calculate immunity level based on points and behavior"""
@@ -191,14 +262,8 @@ def _calculate_immunity_level(positive_points: int, strike_count: int) -> str:
     if strike_count >= 3:
         return "none"
     
-    if positive_points >= IMMUNITY_THRESHOLDS["guardian"]:
-        return "guardian"
-    elif positive_points >= IMMUNITY_THRESHOLDS["veteran"]:
-        return "veteran"
-    elif positive_points >= IMMUNITY_THRESHOLDS["trusted"]:
-        return "trusted"
-    else:
-        return "none"
+    idx = bisect.bisect_right(_TIER_VALUES, positive_points)
+    return _TIER_NAMES[idx - 1] if idx else "none"
 
 # Existing functions remain the same
 async def strike_get(guild_id: str, user_id: str):
@@ -212,27 +277,51 @@ async def strike_clear(guild_id: str, user_id: str):
     async with pool().acquire() as con:
         await con.execute("DELETE FROM strikes WHERE guild_id=$1 AND user_id=$2", guild_id, user_id)
 
+async def guild_stats(guild_id: str) -> dict:
+    """Strike totals for a guild, counting only windows that haven't reset yet"""
+    async with pool().acquire() as con:
+        row = await con.fetchrow("""
+            SELECT COUNT(*) FILTER (WHERE count > 0)::int AS active_users,
+                   COALESCE(SUM(count), 0)::int AS total_strikes
+            FROM strikes
+            WHERE guild_id = $1 AND reset_at >= $2
+        """, guild_id, _now())
+        return {"active_users": row["active_users"], "total_strikes": row["total_strikes"]}
+
+async def cached_guild_stats(guild_id: str) -> dict:
+    """guild_stats behind a short per-guild TTL cache for the status commands"""
+    now = time.monotonic()
+    hit = _guild_stats_cache.get(guild_id)
+    if hit and hit[1] > now:
+        return hit[0]
+    stats = await guild_stats(guild_id)
+    _guild_stats_cache[guild_id] = (stats, now + GUILD_STATS_CACHE_TTL_SEC)
+    return stats
+
 async def cleanup_expired_strikes(guild_id: str) -> int:
     """Remove expired strikes but preserve positive points for active users"""
-    now = _now()
+    return (await cleanup_expired_strikes_many([guild_id])).get(guild_id, 0)
+
+async def cleanup_expired_strikes_many(guild_ids: list[str]) -> dict[str, int]:
+    """cleanup_expired_strikes for several guilds at once; returns deleted rows per guild"""
+    if not guild_ids:
+        return {}
     async with pool().acquire() as con:
-        # Only delete rows with no positive points and expired strikes
-        row = await con.fetchrow("""
+        # One statement: delete expired rows with no positive points, and reset the
+        # strike window on expired rows that have some (writable CTEs always run in full)
+        rows = await con.fetch("""
             WITH del AS (
               DELETE FROM strikes
-              WHERE guild_id = $1
+              WHERE guild_id = ANY($1::text[])
                 AND reset_at < $2
                 AND (positive_points IS NULL OR positive_points <= 0)
-              RETURNING 1
+              RETURNING guild_id
+            ), reset AS (
+              UPDATE strikes
+              SET count = 0, reset_at = $2
+              WHERE guild_id = ANY($1::text[]) AND reset_at < $2 AND positive_points > 0
             )
-            SELECT COUNT(*)::int AS c FROM del
-        """, guild_id, now)
-        
-        # Reset strike counts for expired but keep positive users
-        await con.execute("""
-            UPDATE strikes 
-            SET count = 0, reset_at = $1
-            WHERE guild_id = $2 AND reset_at < $1 AND positive_points > 0
-        """, now, guild_id)
-        
-        return int(row["c"])
\ No newline at end of file
+            SELECT guild_id, COUNT(*)::int AS c FROM del GROUP BY guild_id
+        """, guild_ids, _now())
+
+    return {r["guild_id"]: int(r["c"]) for r in rows}
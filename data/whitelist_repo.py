@@ -1,8 +1,97 @@
+import asyncio
 import time
-from .db import pool
+import uuid
+import asyncpg
+from config.settings import DATABASE_URL
+from utils.logging import log
+from .db import pool, read_pool
 
 def _now(): return int(time.time())
 
+# (guild_id, user_id) -> (is_whitelisted, monotonic expiry); cleared by wl_add/wl_remove
+WL_CACHE_TTL_SEC = 120
+WL_CACHE_MAX = 10_000
+_wl_cache: dict[tuple[str, str], tuple[bool, float]] = {}
+# Bumped by every invalidation, so a lookup that was in flight across one doesn't cache its
+# stale result; the epoch covers full clears (and pruning of the per-key counters)
+_wl_generation: dict[tuple[str, str], int] = {}
+_wl_epoch = 0
+
+# guild_id -> whitelist size; seeded by wl_seed_counts, kept in step by wl_add/wl_remove
+_wl_counts: dict[str, int] = {}
+
+# Other bot processes/shards are told about whitelist changes over this channel;
+# payloads carry our process token so we can ignore our own notifications
+WL_NOTIFY_CHANNEL = "whitelist_changed"
+_PROCESS_TOKEN = uuid.uuid4().hex
+# Dedicated LISTEN connection (outside the pools), re-established if it drops
+WL_LISTENER_RETRY_SEC = 5
+_listener_con = None
+_listener_reconnect: asyncio.Task | None = None
+
+def wl_cache_invalidate(guild_id: str, user_id: str):
+    global _wl_epoch
+    key = (guild_id, user_id)
+    _wl_cache.pop(key, None)
+    if len(_wl_generation) >= WL_CACHE_MAX:
+        _wl_generation.clear()
+        _wl_epoch += 1
+    _wl_generation[key] = _wl_generation.get(key, 0) + 1
+
+def _on_wl_notify(con, pid, channel, payload: str):
+    token, guild_id, user_id = payload.split(":", 2)
+    if token == _PROCESS_TOKEN:
+        return
+    wl_cache_invalidate(guild_id, user_id)
+    _wl_counts.pop(guild_id, None)  # we can't tell insert from update; recount on next read
+
+async def _notify_change(con, guild_id: str, user_id: str):
+    await con.execute(
+        "SELECT pg_notify($1, $2)", WL_NOTIFY_CHANNEL, f"{_PROCESS_TOKEN}:{guild_id}:{user_id}"
+    )
+
+def _forget_cached_whitelist():
+    """Drop everything cached, for when change notifications may have been missed"""
+    global _wl_epoch
+    _wl_cache.clear()
+    _wl_counts.clear()
+    _wl_generation.clear()
+    _wl_epoch += 1
+
+async def _connect_listener():
+    global _listener_con
+    con = await asyncpg.connect(DATABASE_URL)
+    await con.add_listener(WL_NOTIFY_CHANNEL, _on_wl_notify)
+    con.add_termination_listener(_on_listener_lost)
+    _listener_con = con
+
+def _on_listener_lost(con):
+    global _listener_con, _listener_reconnect
+    if con is not _listener_con:
+        return
+    _listener_con = None
+    log.warning("Whitelist listener connection lost; reconnecting")
+    _forget_cached_whitelist()
+    _listener_reconnect = asyncio.get_running_loop().create_task(_reconnect_listener())
+
+async def _reconnect_listener():
+    while True:
+        try:
+            await _connect_listener()
+        except Exception as e:
+            log.warning("Whitelist listener reconnect failed: %s", e)
+            await asyncio.sleep(WL_LISTENER_RETRY_SEC)
+        else:
+            # Anything changed while we were disconnected was never notified to us
+            _forget_cached_whitelist()
+            return
+
+async def wl_start_listener():
+    """LISTEN for whitelist changes from other processes (idempotent; call after init_pool)"""
+    reconnecting = _listener_reconnect is not None and not _listener_reconnect.done()
+    if _listener_con is None and not reconnecting:
+        await _connect_listener()
+
 async def wl_add(guild_id: str, user_id: str, reason: str | None, added_by: str | None, expires_at: int | None = None):
     """
     Upsert whitelist entry and tell the caller whether we inserted or updated.
@@ -22,7 +111,11 @@ async def wl_add(guild_id: str, user_id: str, reason: str | None, added_by: str
             """,
             guild_id, user_id, reason, added_by, _now(), expires_at
         )
+        await _notify_change(con, guild_id, user_id)
+        wl_cache_invalidate(guild_id, user_id)
         inserted = bool(row["inserted"])
+        if inserted and guild_id in _wl_counts:
+            _wl_counts[guild_id] += 1
         return {"inserted": inserted, "updated": (not inserted)}
 
 async def wl_remove(guild_id: str, user_id: str):
@@ -35,22 +128,69 @@ async def wl_remove(guild_id: str, user_id: str):
             "DELETE FROM whitelist WHERE guild_id=$1 AND user_id=$2 RETURNING 1 AS removed",
             guild_id, user_id
         )
+        if row:
+            await _notify_change(con, guild_id, user_id)
+            if guild_id in _wl_counts:
+                _wl_counts[guild_id] -= 1
+        wl_cache_invalidate(guild_id, user_id)
         return {"removed": bool(row)}
 
-async def wl_is_whitelisted(guild_id: str, user_id: str) -> bool:
-    async with pool().acquire() as con:
+async def _wl_lookup(guild_id: str, user_id: str) -> tuple[bool, int | None]:
+    """(is_whitelisted, expires_at) for an active entry; (False, None) if there is none"""
+    async with read_pool().acquire() as con:
         row = await con.fetchrow(
             """
-            SELECT 1
+            SELECT expires_at
             FROM whitelist
             WHERE guild_id=$1 AND user_id=$2
               AND (expires_at IS NULL OR expires_at >= $3)
             """,
             guild_id, user_id, _now()
         )
-        return bool(row)
+        return (True, row["expires_at"]) if row else (False, None)
+
+async def wl_is_whitelisted(guild_id: str, user_id: str) -> bool:
+    return (await _wl_lookup(guild_id, user_id))[0]
+
+async def cached_wl_is_whitelisted(guild_id: str, user_id: str) -> bool:
+    """
+    wl_is_whitelisted behind a small in-process TTL/LRU cache for the per-message path.
+    """
+    key = (guild_id, user_id)
+    now = time.monotonic()
+    hit = _wl_cache.pop(key, None)
+    if hit and hit[1] > now:
+        _wl_cache[key] = hit  # re-insert as most recently used
+        return hit[0]
+    generation = (_wl_epoch, _wl_generation.get(key, 0))
+    result, expires_at = await _wl_lookup(guild_id, user_id)
+    if generation != (_wl_epoch, _wl_generation.get(key, 0)):
+        return result  # invalidated while we were looking; don't cache a stale answer
+    
+    # A timed entry is only cached until it expires
+    ttl = WL_CACHE_TTL_SEC
+    if expires_at is not None:
+        ttl = min(ttl, expires_at - time.time())
+    _wl_cache[key] = (result, now + ttl)
+    if len(_wl_cache) > WL_CACHE_MAX:
+        _wl_cache.pop(next(iter(_wl_cache)))
+    return result
 
 async def wl_count(guild_id: str) -> int:
     async with pool().acquire() as con:
         row = await con.fetchrow("SELECT COUNT(*)::int AS c FROM whitelist WHERE guild_id=$1", guild_id)
         return int(row["c"])
+
+async def wl_seed_counts():
+    """Load every guild's whitelist size in one query (call once after init_pool)"""
+    async with pool().acquire() as con:
+        rows = await con.fetch("SELECT guild_id, COUNT(*)::int AS c FROM whitelist GROUP BY guild_id")
+    _wl_counts.clear()
+    _wl_counts.update((r["guild_id"], r["c"]) for r in rows)
+
+async def cached_wl_count(guild_id: str) -> int:
+    """Whitelist size from the in-process counter, counting in the DB only on a miss"""
+    count = _wl_counts.get(guild_id)
+    if count is None:
+        count = _wl_counts[guild_id] = await wl_count(guild_id)
+    return count
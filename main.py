@@ -6,12 +6,14 @@ Discord Moderation Bot - Main Entry Point
 import asyncio
 from bot.client import create_bot
 from config.settings import TOKEN
+from utils.logging import setup_logging
 
 def main():
     """Main entry point for the Discord bot"""
     if not TOKEN:
         raise SystemExit("❌ Set DISCORD_BOT_TOKEN in .env file")
     
+    setup_logging()
     print("🚀 Starting Discord Moderation Bot...")
     bot = create_bot()
     bot.run(TOKEN)
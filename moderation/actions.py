@@ -2,16 +2,56 @@
 Moderation actions - timeouts, kicks, warnings, etc.
 """
 
+import asyncio
+import time
 import discord
+from dataclasses import dataclass
+from functools import lru_cache
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict, Any
-from config.settings import STRIKE_ESCALATION, PUNISHMENT_DURATIONS
+from utils.logging import log
+from utils.helpers import bulk_delete_messages
+from config.settings import escalation_for, STRIKE_ESCALATION, PUNISHMENT_DURATIONS
+
+# Deletes are buffered per channel and sent as one bulk request after this delay
+DELETE_FLUSH_DELAY = 0.5
+
+# fetch_member results (including "not in guild") are reused for this long
+MEMBER_CACHE_TTL_SEC = 300
+MEMBER_CACHE_MAX = 1024
+
+@lru_cache(maxsize=64)
+def _timeout_delta(duration_minutes: int) -> timedelta:
+    """Shared timedelta per timeout length (escalation only uses a handful)"""
+    return timedelta(minutes=duration_minutes)
+
+@dataclass(frozen=True, slots=True)
+class Punishment:
+    """Escalation decision for a violation (immutable, so identical ones are shared)"""
+    action: str
+    duration: int = 0
+    escalated: bool = False
+
+# The fixed outcomes, built once instead of a fresh dict per violation
+_ESCALATION_PUNISHMENTS = tuple(
+    Punishment(action, duration, True) for _, action, duration in STRIKE_ESCALATION
+)
+_WARN = Punishment("warn")
+_KICK = Punishment("kick", escalated=True)
+_TIMEOUT_15 = Punishment("timeout", 15)
+_TIMEOUT_15_ESCALATED = Punishment("timeout", 15, True)
+_TIMEOUT_60_ESCALATED = Punishment("timeout", 60, True)
+_TIMEOUT_240 = Punishment("timeout", 240)
 
 class ModerationActions:
     """Handles all moderation actions and punishments"""
     
     def __init__(self):
-        pass
+        # channel_id -> [(message, future resolved with the delete result)]
+        self._pending_deletes: Dict[int, list] = {}
+        self._delete_tasks: set = set()
+        # (guild_id, user_id) -> (member or None, expires_at)
+        self._member_cache: Dict[tuple, tuple] = {}
     
     async def send_dm_warning(self, user: discord.User | discord.Member, 
                             level: str, reason: str, strike_count: int) -> bool:
@@ -37,7 +77,7 @@ class ModerationActions:
         except discord.Forbidden:
             return False
         except Exception as e:
-            print(f"DM error: {e}")
+            log.warning("DM error: %s", e)
             return False
         
     
@@ -51,7 +91,7 @@ class ModerationActions:
             Dict with action result information
         """
         try:
-            until = datetime.now(timezone.utc) + timedelta(minutes=duration_minutes)
+            until = datetime.now(timezone.utc) + _timeout_delta(duration_minutes)
             await member.timeout(until, reason=reason)
             
             return {
@@ -106,61 +146,92 @@ class ModerationActions:
     
     async def delete_message(self, message: discord.Message) -> bool:
         """
-        Delete a message
+        Delete a message (batched with other deletes in the same channel)
         
         Returns:
             bool: True if message was deleted successfully
         """
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        pending = self._pending_deletes.get(message.channel.id)
+        if pending is None:
+            pending = self._pending_deletes[message.channel.id] = []
+            task = loop.create_task(self._flush_deletes(message.channel.id))
+            self._delete_tasks.add(task)
+            task.add_done_callback(self._delete_tasks.discard)
+        pending.append((message, fut))
+        return await fut
+    
+    async def _flush_deletes(self, channel_id: int):
+        """Delete everything buffered for a channel, in bulk where Discord allows it"""
+        await asyncio.sleep(DELETE_FLUSH_DELAY)
+        pending = self._pending_deletes.pop(channel_id)
+        
+        results = await bulk_delete_messages([msg for msg, _ in pending])
+        for (_, fut), deleted in zip(pending, results):
+            if not fut.done():
+                fut.set_result(deleted)
+    
+    async def _resolve_member(self, message: discord.Message) -> Optional[discord.Member]:
+        """The message author as a guild Member, avoiding a REST fetch whenever possible"""
+        author = message.author
+        if isinstance(author, discord.Member):
+            return author
+        guild = message.guild
+        member = guild.get_member(author.id)
+        if member is not None:
+            return member
+        
+        key = (guild.id, author.id)
+        now = time.monotonic()
+        cached = self._member_cache.get(key)
+        if cached is not None and cached[1] > now:
+            return cached[0]
+        
         try:
-            await message.delete()
-            return True
-        except discord.Forbidden:
-            return False
+            member = await guild.fetch_member(author.id)
         except discord.NotFound:
-            return True  # Message already deleted
-        except Exception:
-            return False
+            member = None
+        if len(self._member_cache) >= MEMBER_CACHE_MAX:
+            self._member_cache = {k: v for k, v in self._member_cache.items() if v[1] > now}
+        self._member_cache[key] = (member, now + MEMBER_CACHE_TTL_SEC)
+        return member
     
-    def get_escalated_punishment(self, strike_count: int, base_level: str) -> Dict[str, Any]:
+    def get_escalated_punishment(self, strike_count: int, base_level: str) -> Punishment:
         """
         Determine punishment based on strike count and violation level
         
         Returns:
-            Dict with punishment details
+            Punishment: shared instance for the fixed outcomes
         """
         # Check if we have specific escalation rules
-        if strike_count in STRIKE_ESCALATION:
-            escalation = STRIKE_ESCALATION[strike_count]
-            return {
-                "action": escalation["action"],
-                "duration": escalation["duration"],
-                "escalated": True
-            }
+        if escalation_for(strike_count) is not None:
+            return _ESCALATION_PUNISHMENTS[strike_count - 1]
         
         # Default escalation logic
         if base_level == "warn":
             if strike_count >= 5:
-                return {"action": "timeout", "duration": 60, "escalated": True}
+                return _TIMEOUT_60_ESCALATED
             elif strike_count >= 3:
-                return {"action": "timeout", "duration": 15, "escalated": True}
+                return _TIMEOUT_15_ESCALATED
             else:
-                return {"action": "warn", "duration": 0, "escalated": False}
+                return _WARN
         
         elif base_level == "flag":
             if strike_count >= 4:
-                return {"action": "kick", "duration": 0, "escalated": True}
+                return _KICK
             elif strike_count >= 2:
-                return {"action": "timeout", "duration": 60 * strike_count, "escalated": True}
+                return Punishment("timeout", 60 * strike_count, True)
             else:
-                return {"action": "timeout", "duration": 15, "escalated": False}
+                return _TIMEOUT_15
         
         elif base_level == "severe":
             if strike_count >= 2:
-                return {"action": "kick", "duration": 0, "escalated": True}
+                return _KICK
             else:
-                return {"action": "timeout", "duration": 240, "escalated": False}
+                return _TIMEOUT_240
         
-        return {"action": "warn", "duration": 0, "escalated": False}
+        return _WARN
     
     async def handle_violation(self, message: discord.Message, level: str, 
                              reason: str, strike_count: int) -> Dict[str, Any]:
@@ -182,55 +253,24 @@ class ModerationActions:
             # Get escalated punishment
             punishment = self.get_escalated_punishment(strike_count, level)
             
-            # Delete message for flag and severe violations
-            if level in ["flag", "severe"]:
-                results["message_deleted"] = await self.delete_message(message)
-                if not results["message_deleted"]:
-                    results["errors"].append("Failed to delete message")
-            
-            # Send DM warning
-            results["dm_sent"] = await self.send_dm_warning(
+            # Delete, DM and punishment are independent REST calls, so they run concurrently
+            dm_task = asyncio.create_task(self.send_dm_warning(
                 message.author, level, reason, strike_count
-            )
+            ))
+            steps = [dm_task, self._apply_punishment(message, punishment, reason, strike_count, dm_task, results)]
             
-            # Apply punishment
-            if punishment["action"] == "timeout" and punishment["duration"] > 0:
-                try:
-                    member = await message.guild.fetch_member(message.author.id)
-                    timeout_result = await self.timeout_user(
-                        member, punishment["duration"], f"{reason} (Strike {strike_count})"
-                    )
-                    results["punishment_applied"] = timeout_result["success"]
-                    results["punishment_details"] = timeout_result
-                    
-                    if not timeout_result["success"]:
-                        results["errors"].append(f"Timeout failed: {timeout_result.get('error', 'Unknown')}")
-                        
-                except discord.NotFound:
-                    results["errors"].append("User not found in guild")
-                
-            elif punishment["action"] == "kick":
-                try:
-                    member = await message.guild.fetch_member(message.author.id)
-                    kick_result = await self.kick_user(
-                        member, f"Multiple violations: {reason}"
-                    )
-                    results["punishment_applied"] = kick_result["success"]
-                    results["punishment_details"] = kick_result
-                    
-                    if not kick_result["success"]:
-                        results["errors"].append(f"Kick failed: {kick_result.get('error', 'Unknown')}")
-                        
-                except discord.NotFound:
-                    results["errors"].append("User not found in guild")
+            # Delete message for flag and severe violations
+            if level in ("flag", "severe"):
+                steps.append(self._delete_violating_message(message, results))
             
-            else:
-                # Just warning
-                results["punishment_applied"] = True
-                results["punishment_details"] = {"action": "warning"}
+            outcomes = await asyncio.gather(*steps, return_exceptions=True)
+            results["dm_sent"] = outcomes[0] is True
+            for outcome in outcomes:
+                if isinstance(outcome, Exception):
+                    results["errors"].append(f"General error: {str(outcome)}")
             
             # Add escalation info
-            results["escalated"] = punishment.get("escalated", False)
+            results["escalated"] = punishment.escalated
             results["strike_count"] = strike_count
             
         except Exception as e:
@@ -238,6 +278,49 @@ class ModerationActions:
         
         return results
     
+    async def _delete_violating_message(self, message: discord.Message, results: Dict[str, Any]):
+        results["message_deleted"] = await self.delete_message(message)
+        if not results["message_deleted"]:
+            results["errors"].append("Failed to delete message")
+    
+    async def _apply_punishment(self, message: discord.Message, punishment: Punishment, reason: str,
+                                strike_count: int, dm_task: asyncio.Task, results: Dict[str, Any]):
+        """Timeout or kick the author, recording the outcome in results"""
+        if punishment.action == "timeout" and punishment.duration > 0:
+            member = await self._resolve_member(message)
+            if member is None:
+                results["errors"].append("User not found in guild")
+            else:
+                timeout_result = await self.timeout_user(
+                    member, punishment.duration, f"{reason} (Strike {strike_count})"
+                )
+                results["punishment_applied"] = timeout_result["success"]
+                results["punishment_details"] = timeout_result
+                
+                if not timeout_result["success"]:
+                    results["errors"].append(f"Timeout failed: {timeout_result.get('error', 'Unknown')}")
+            
+        elif punishment.action == "kick":
+            member = await self._resolve_member(message)
+            if member is None:
+                results["errors"].append("User not found in guild")
+            else:
+                # The DM can't be delivered once we no longer share a guild, so let it land first
+                await asyncio.wait((dm_task,))
+                kick_result = await self.kick_user(
+                    member, f"Multiple violations: {reason}"
+                )
+                results["punishment_applied"] = kick_result["success"]
+                results["punishment_details"] = kick_result
+                
+                if not kick_result["success"]:
+                    results["errors"].append(f"Kick failed: {kick_result.get('error', 'Unknown')}")
+        
+        else:
+            # Just warning
+            results["punishment_applied"] = True
+            results["punishment_details"] = {"action": "warning"}
+    
     def format_action_summary(self, results: Dict[str, Any]) -> str:
         """
         Create a human-readable summary of actions taken
@@ -4,51 +4,127 @@ Enhanced with Community Immunity System
 """
 
 import re
+import string
+import time
+import asyncio
+from functools import lru_cache
+from hashlib import blake2b
 from typing import Tuple, Set
 from moderation.detector import ToxicityDetector
-from config.settings import TOXICITY_THRESHOLDS
-from data.whitelist_repo import wl_is_whitelisted
-from data.strikes_repo import get_user_immunity, process_clean_message
+from config.settings import TOXICITY_THRESHOLDS, MAX_MESSAGE_LENGTH, PERSPECTIVE_API_KEY, OPENAI_API_KEY
+from data.whitelist_repo import cached_wl_is_whitelisted
+from data.strikes_repo import get_user_immunity, process_clean_message, no_immunity
+from utils.helpers import clean_text
+
+# AI analysis per canonical text (copy-paste spam, raids, "gg"), FIFO-evicted past the cap.
+# Texts differing only in case, whitespace or zero-width characters share an entry
+ANALYSIS_CACHE_TTL_SEC = 300
+ANALYSIS_CACHE_MAX = 4096
+
+# Short everyday chatter the AI never flags; a message made only of these skips the API calls
+TRIVIAL_MAX_LEN = 24
+_BENIGN_WORDS = frozenset({
+    "gg", "ggs", "wp", "glhf", "gl", "hf", "lol", "lmao", "lmfao", "rofl", "haha", "hahaha",
+    "ok", "okay", "k", "kk", "ya", "yes", "yeah", "yep", "no", "nope", "nah", "sure",
+    "ty", "thx", "thanks", "thank", "you", "np", "yw", "hi", "hey", "hello", "bye",
+    "gn", "gm", "brb", "afk", "omw", "nice", "cool", "true", "same", "wow", "oh", "ah", "hmm",
+})
+_WORD_RE = re.compile(r"[a-z0-9']+")
+# Fewer letters/digits than this (emoji runs, "?!") gives the AI nothing to score; kept low
+# because 2-3 letter abuse ("kys") is exactly what the AI is for
+MIN_AI_ALNUM = 2
+_URL_PREFIXES = ("http://", "https://")
+
+# OpenAI moderation categories that make a flagged message severe
+_SEVERE_OPENAI_CATEGORIES = frozenset({
+    'hate', 'hate/threatening', 'violence', 'violence/graphic',
+    'harassment', 'harassment/threatening', 'self-harm'
+})
+
+# Deletion tables for the ASCII path of is_caps_spam
+_ASCII_LETTERS = string.ascii_letters.encode()
+_ASCII_UPPER = string.ascii_uppercase.encode()
 
 class MessageClassifier:
     """Handles message analysis and classification with immunity system"""
     
+    __slots__ = (
+        "detector", "spam_pattern", "invite_pattern", "link_pattern",
+        "aggressive_keywords", "aggressive_pattern",
+        "_cached_rule_violations", "_analysis_cache", "_analysis_inflight",
+    )
+    
     def __init__(self):
         self.detector = ToxicityDetector()
         
-        # Compile regex patterns for rule-based checks
-        self.spam_patterns = [
-            re.compile(r"(.)\1{4,}", re.IGNORECASE),  # repeated characters
-            re.compile(r"(.+?)\1{3,}", re.IGNORECASE),  # repeated phrases
-            re.compile(r"[!@#$%^&*]{5,}", re.IGNORECASE),  # excessive punctuation
-        ]
+        # Compile regex patterns for rule-based checks; each group is one alternation, one scan
+        self.spam_pattern = re.compile(
+            r"(.)\1{4,}"  # repeated characters
+            # repeated phrases; the unit is bounded so a long text can't backtrack quadratically
+            r"|(.{1,32}?)\2{3,}"
+            r"|[!@#$%^&*]{5,}",  # excessive punctuation
+            re.IGNORECASE
+        )
         
         self.invite_pattern = re.compile(
             r"discord\.gg/[a-zA-Z0-9]+|discordapp\.com/invite/[a-zA-Z0-9]+", 
             re.IGNORECASE
         )
         
-        self.suspicious_links = re.compile(
-            r"(bit\.ly|tinyurl|t\.co|goo\.gl)/\S+", 
+        # Invites and shortened links together; lastgroup tells which one matched first
+        self.link_pattern = re.compile(
+            rf"(?P<invite>{self.invite_pattern.pattern})"
+            r"|(?P<link>(bit\.ly|tinyurl|t\.co|goo\.gl)/\S+)",
             re.IGNORECASE
         )
+
+        # Aggressive phrasing checked alongside a mention; one alternation, one scan.
+        # Every branch needs one of the keywords, so text without any skips the regex
+        self.aggressive_keywords = (
+            "shut up", "stfu", "go away", "leave", "nobody wants",
+            "hate", "despise", "can't stand", "suck", "terrible", "awful", "worst"
+        )
+        self.aggressive_pattern = re.compile(
+            r"(shut up|stfu|go away|leave|nobody wants)"
+            r"|(hate|despise|can't stand).*you"
+            r"|you.*(suck|terrible|awful|worst)",
+            re.IGNORECASE
+        )
+
+        # Rule checks are pure functions of the text; repeats (copy-paste spam, admin re-tests) hit the cache
+        self._cached_rule_violations = lru_cache(maxsize=1024)(self._check_rule_violations)
+        # (canonical text digest, apis_enabled) -> (analyze_toxicity result, monotonic expiry)
+        self._analysis_cache: dict[tuple[bytes, bool], tuple[dict, float]] = {}
+        # Same keys -> future of the analysis already running, so a burst of one text calls the APIs once
+        self._analysis_inflight: dict[tuple[bytes, bool], asyncio.Future] = {}
     
     def is_caps_spam(self, text: str) -> bool:
         """Detect excessive caps usage"""
-        letters = [c for c in text if c.isalpha()]
-        if len(letters) < 8:
+        if text.isascii():
+            # ASCII fast path: count by deleting letters / capitals in C and comparing lengths
+            raw = text.encode("ascii")
+            letters = len(raw) - len(raw.translate(None, _ASCII_LETTERS))
+            caps = len(raw) - len(raw.translate(None, _ASCII_UPPER))
+        else:
+            # Some non-letters (e.g. Roman numerals) are upper; count caps among letters only
+            letters = caps = 0
+            for c in text:
+                if c.isalpha():
+                    letters += 1
+                    caps += c.isupper()
+        if letters < 8:
             return False
         
-        caps = sum(1 for c in letters if c.isupper())
-        caps_ratio = caps / len(letters)
+        caps_ratio = caps / letters
         
         # More lenient for shorter messages
-        threshold = 0.8 if len(letters) < 20 else 0.7
+        threshold = 0.8 if letters < 20 else 0.7
         return caps_ratio > threshold
     
     def is_spam(self, text: str) -> bool:
         """Detect various spam patterns"""
-        return any(pattern.search(text) for pattern in self.spam_patterns)
+        text = text[:MAX_MESSAGE_LENGTH]
+        return self.spam_pattern.search(text) is not None
     
     def is_targeted_harassment(self, text: str) -> bool:
         """Detect targeted harassment with mentions"""
@@ -56,27 +132,54 @@ class MessageClassifier:
         if not has_mention:
             return False
         
-        # Check for aggressive patterns with mentions
-        aggressive_patterns = [
-            r"(shut up|stfu|go away|leave|nobody wants)",
-            r"(hate|despise|can't stand).*you",
-            r"you.*(suck|terrible|awful|worst)"
-        ]
+        # Cheap keyword prefilter (casefold matches at least what re.IGNORECASE does)
+        folded = text.casefold()
+        if not any(keyword in folded for keyword in self.aggressive_keywords):
+            return False
         
-        return any(re.search(pattern, text, re.IGNORECASE) for pattern in aggressive_patterns)
+        # Check for aggressive patterns with mentions
+        return self.aggressive_pattern.search(text) is not None
     
     def has_suspicious_content(self, text: str) -> Tuple[bool, str]:
         """Detect suspicious links or invites"""
-        if self.invite_pattern.search(text):
+        match = self.link_pattern.search(text)
+        if match is None:
+            return False, ""
+        # An invite anywhere takes precedence over an earlier shortened link
+        if match.lastgroup == "invite" or self.invite_pattern.search(text, match.end()):
             return True, "unauthorized invite"
-        if self.suspicious_links.search(text):
-            return True, "suspicious link"
-        return False, ""
+        return True, "suspicious link"
+    
+    def _is_small_talk(self, text: str) -> bool:
+        """Short benign small talk the AI never flags"""
+        if len(text) <= TRIVIAL_MAX_LEN and text.isascii():
+            words = _WORD_RE.findall(text.lower())
+            return bool(words) and all(word in _BENIGN_WORDS for word in words)
+        return False
     
-    async def classify_message(self, text: str, author_id: int, guild_id: str) -> Tuple[str, str, dict]:
+    def _has_nothing_to_score(self, text: str) -> bool:
+        """Text the AI has nothing to score: only URLs, or (almost) no letters/digits"""
+        # Only URLs (the link rules don't run on AI-clean messages either)
+        if all(word.startswith(_URL_PREFIXES) for word in text.split()):
+            return True
+        
+        alnum = 0
+        for c in text:
+            if c.isalnum():
+                alnum += 1
+                if alnum >= MIN_AI_ALNUM:
+                    return False
+        return True
+    
+    async def classify_message(self, text: str, author_id: int, guild_id: str,
+                               apis_enabled: bool = True, dry_run: bool = False) -> Tuple[str, str, dict]:
         """
         Enhanced classification with immunity system
         
+        apis_enabled=False skips the Perspective/OpenAI calls (fallback patterns only).
+        dry_run=True classifies the text as if from an ordinary user: no whitelist check,
+        no immunity, and no positive points awarded.
+        
         Returns:
             Tuple[str, str, dict]: (severity_level, reason, analysis_data)
         """
@@ -85,14 +188,30 @@ class MessageClassifier:
             return "none", "empty message", {}
         
         # Check database whitelist first
-        if await wl_is_whitelisted(str(guild_id), str(author_id)):
+        if not dry_run and await cached_wl_is_whitelisted(str(guild_id), str(author_id)):
             return "none", "database whitelisted user", {}
         
+        # Obvious small talk scores ~0 everywhere; count it as clean without the API round trip.
+        # It's at most TRIVIAL_MAX_LEN long, so this is only the base clean point, never the
+        # quality bonus
+        if self._is_small_talk(text):
+            if not dry_run:
+                await process_clean_message(str(guild_id), str(author_id), text, 0.0)
+            return "none", "clean message", {}
+        
+        # Emoji walls and bare links skip the AI too, but earn nothing: points need a real
+        # API score, or they could be farmed into immunity
+        if self._has_nothing_to_score(text):
+            return "none", "clean message", {}
+        
         # Get user's immunity status
-        immunity = await get_user_immunity(str(guild_id), str(author_id))
+        if dry_run:
+            immunity = no_immunity()
+        else:
+            immunity = await get_user_immunity(str(guild_id), str(author_id))
         
         # Get AI analysis
-        analysis = await self.detector.analyze_toxicity(text)
+        analysis = await self._analyze(text, apis_enabled)
         perspective_score = analysis["perspective"]["score"]
         openai_flagged = analysis["openai"]["flagged"]
         openai_categories = analysis["openai"]["categories"]
@@ -102,7 +221,7 @@ class MessageClassifier:
         analysis["immunity"] = immunity
         
         # Process clean messages for positive points
-        if perspective_score < 0.2 and not openai_flagged:
+        if perspective_score < 0.2 and not openai_flagged and not dry_run:
             await process_clean_message(str(guild_id), str(author_id), text, perspective_score)
             # Still continue with analysis in case of rule violations
         
@@ -114,7 +233,7 @@ class MessageClassifier:
         
         if final_severity != "none":
             # Check rule-based violations (these bypass some immunity)
-            rule_violation = self._check_rule_violations(text)
+            rule_violation = self._cached_rule_violations(text)
             if rule_violation[0] != "none":
                 # Rule violations have different immunity rules
                 final_severity, immunity_reason = self._apply_immunity_to_rules(rule_violation, immunity)
@@ -179,6 +298,52 @@ class MessageClassifier:
         
         return base_severity, ""
     
+    async def _analyze(self, text: str, apis_enabled: bool) -> dict:
+        """analyze_toxicity behind a TTL cache and in-flight dedup; returns a copy the caller may annotate"""
+        key = (blake2b(clean_text(text).lower().encode(), digest_size=16).digest(), apis_enabled)
+        now = time.monotonic()
+        hit = self._analysis_cache.get(key)
+        if hit and hit[1] > now:
+            return dict(hit[0])
+        
+        pending = self._analysis_inflight.get(key)
+        if pending is not None:
+            return dict(await asyncio.shield(pending))
+        
+        fut = asyncio.get_running_loop().create_future()
+        self._analysis_inflight[key] = fut
+        try:
+            analysis = await self.detector.analyze_toxicity(text, apis_enabled)
+            fut.set_result(analysis)
+        except Exception as e:
+            # Waiters see the leader's real error; exception() marks it retrieved if there are none
+            fut.set_exception(e)
+            fut.exception()
+            raise
+        finally:
+            del self._analysis_inflight[key]
+            if not fut.done():
+                fut.cancel()  # the leader was cancelled; its waiters give up too
+        
+        # A fallback-only result (APIs down, breaker open, or disabled) isn't cached, so an
+        # outage doesn't stick to this text after the APIs recover
+        if self._answered_by_apis(analysis):
+            self._analysis_cache[key] = (analysis, now + ANALYSIS_CACHE_TTL_SEC)
+            if len(self._analysis_cache) > ANALYSIS_CACHE_MAX:
+                self._analysis_cache.pop(next(iter(self._analysis_cache)))
+        return dict(analysis)
+    
+    @staticmethod
+    def _answered_by_apis(analysis: dict) -> bool:
+        """True when every configured moderation API contributed to the analysis"""
+        if not (PERSPECTIVE_API_KEY or OPENAI_API_KEY):
+            return False
+        if PERSPECTIVE_API_KEY and not analysis["perspective"]["details"]:
+            return False
+        if OPENAI_API_KEY and not analysis["openai"]["categories"]:
+            return False
+        return True
+    
     def _check_rule_violations(self, text: str) -> Tuple[str, str]:
         """Check for rule-based violations"""
         
@@ -221,8 +386,4 @@ class MessageClassifier:
     
     def _is_severe_openai_violation(self, categories: dict) -> bool:
         """Check if OpenAI categories indicate severe violation"""
-        severe_categories = [
-            'hate', 'hate/threatening', 'violence', 'violence/graphic',
-            'harassment', 'harassment/threatening', 'self-harm'
-        ]
-        return any(categories.get(cat, False) for cat in severe_categories)
\ No newline at end of file
+        return any(categories.get(cat, False) for cat in _SEVERE_OPENAI_CATEGORIES)
\ No newline at end of file
@@ -2,25 +2,96 @@
 AI-powered toxicity detection using Perspective API and OpenAI
 """
 
-import re
+import asyncio
+import time
 import aiohttp
 from typing import Dict, Tuple
-from googleapiclient import discovery
-from config.settings import PERSPECTIVE_API_KEY, OPENAI_API_KEY, FALLBACK_PATTERNS
+from config.settings import PERSPECTIVE_API_KEY, OPENAI_API_KEY, FALLBACK_PATTERNS_COMPILED
+from utils.logging import log
+
+# Moderation texts arriving within this window go to OpenAI as one array request
+OPENAI_BATCH_MAX = 32
+OPENAI_BATCH_WAIT = 0.025
+
+PERSPECTIVE_URL = "https://commentanalyzer.googleapis.com/v1alpha1/comments:analyze"
+PERSPECTIVE_ATTRIBUTES = {
+    'TOXICITY': {},
+    'SEVERE_TOXICITY': {},
+    'IDENTITY_ATTACK': {},
+    'INSULT': {},
+    'PROFANITY': {},
+    'THREAT': {},
+    'SEXUALLY_EXPLICIT': {},
+    'FLIRTATION': {}
+}
+
+# One pooled HTTP client for every API call (keeps TLS connections alive between messages)
+HTTP_CONNECTION_LIMIT = 64
+HTTP_CONNECTION_LIMIT_PER_HOST = 32
+
+# After this many consecutive failures a provider is skipped for the cooldown
+# (fallback patterns only) instead of every message waiting out its timeout
+BREAKER_MAX_FAILURES = 5
+BREAKER_COOLDOWN_SEC = 30.0
+
+class _CircuitBreaker:
+    """Consecutive-failure counter that takes a provider offline for a cooldown"""
+    
+    __slots__ = ("name", "failures", "open_until")
+    
+    def __init__(self, name: str):
+        self.name = name
+        self.failures = 0
+        self.open_until = 0.0
+    
+    def allow(self) -> bool:
+        return time.monotonic() >= self.open_until
+    
+    def record_success(self):
+        self.failures = 0
+    
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= BREAKER_MAX_FAILURES:
+            self.failures = 0
+            self.open_until = time.monotonic() + BREAKER_COOLDOWN_SEC
+            log.warning("%s failing; skipping it for %.0fs", self.name, BREAKER_COOLDOWN_SEC)
 
 class ToxicityDetector:
     """Handles AI-based toxicity detection with fallback patterns"""
     
+    __slots__ = (
+        "fallback_patterns", "_session", "_openai_pending", "_openai_tasks",
+        "_perspective_breaker", "_openai_breaker",
+    )
+    
     def __init__(self):
-        self.perspective_service = None
-        self.fallback_patterns = self._compile_fallback_patterns()
-        
-    def _compile_fallback_patterns(self) -> Dict:
-        """Compile regex patterns for fallback detection"""
-        return {
-            level: [re.compile(pattern, re.IGNORECASE) for pattern in patterns]
-            for level, patterns in FALLBACK_PATTERNS.items()
-        }
+        self.fallback_patterns = FALLBACK_PATTERNS_COMPILED
+        self._session: aiohttp.ClientSession | None = None
+        # (text, future) pairs waiting for the next OpenAI batch
+        self._openai_pending: list = []
+        self._openai_tasks: set = set()
+        self._perspective_breaker = _CircuitBreaker("Perspective API")
+        self._openai_breaker = _CircuitBreaker("OpenAI Moderation")
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Shared aiohttp session, created on first use inside the running loop"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=HTTP_CONNECTION_LIMIT,
+                    limit_per_host=HTTP_CONNECTION_LIMIT_PER_HOST,
+                    ttl_dns_cache=300,
+                    keepalive_timeout=60
+                )
+            )
+        return self._session
+    
+    async def close(self):
+        """Close the shared HTTP session"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
     
     async def check_perspective_api(self, text: str) -> Tuple[float, Dict]:
         """
@@ -29,33 +100,27 @@ class ToxicityDetector:
         Returns:
             Tuple[float, Dict]: (max_score, all_scores)
         """
-        if not PERSPECTIVE_API_KEY:
+        if not PERSPECTIVE_API_KEY or not self._perspective_breaker.allow():
             return 0.0, {}
         
         try:
-            if not self.perspective_service:
-                self.perspective_service = discovery.build(
-                    'commentanalyzer', 'v1alpha1',
-                    developerKey=PERSPECTIVE_API_KEY,
-                    discoveryServiceUrl="https://commentanalyzer.googleapis.com/$discovery/rest?version=v1alpha1"
-                )
-            
             analyze_request = {
                 'comment': {'text': text},
                 'languages':["en"],
-                'requestedAttributes': {
-                    'TOXICITY': {},
-                    'SEVERE_TOXICITY': {},
-                    'IDENTITY_ATTACK': {},
-                    'INSULT': {},
-                    'PROFANITY': {},
-                    'THREAT': {},
-                    'SEXUALLY_EXPLICIT': {},
-                    'FLIRTATION': {}
-                }
+                'requestedAttributes': PERSPECTIVE_ATTRIBUTES
             }
             
-            response = self.perspective_service.comments().analyze(body=analyze_request).execute()
+            async with self._get_session().post(
+                PERSPECTIVE_URL,
+                params={'key': PERSPECTIVE_API_KEY},
+                json=analyze_request,
+                timeout=aiohttp.ClientTimeout(total=5)
+            ) as resp:
+                if resp.status != 200:
+                    log.warning("Perspective API error: HTTP %s", resp.status)
+                    self._perspective_breaker.record_failure()
+                    return 0.0, {}
+                response = await resp.json()
             
             scores = {}
             for attribute, data in response['attributeScores'].items():
@@ -63,50 +128,80 @@ class ToxicityDetector:
             
             # Get the highest toxicity score
             max_score = max(scores.values()) if scores else 0.0
+            self._perspective_breaker.record_success()
             return max_score, scores
             
         except Exception as e:
-            print(f"Perspective API error: {e}")
+            log.warning("Perspective API error: %s", e)
+            self._perspective_breaker.record_failure()
             return 0.0, {}
     
     async def check_openai_moderation(self, text: str) -> Tuple[bool, Dict, float]:
         """
-        Check content using OpenAI Moderation API
+        Check content using OpenAI Moderation API (batched with concurrent callers)
         
         Returns:
             Tuple[bool, Dict, float]: (flagged, categories, confidence)
         """
-        if not OPENAI_API_KEY:
+        if not OPENAI_API_KEY or not self._openai_breaker.allow():
             return False, {}, 0.0
         
+        fut = asyncio.get_running_loop().create_future()
+        self._openai_pending.append((text, fut))
+        if len(self._openai_pending) == 1:
+            self._spawn(self._flush_openai_after(OPENAI_BATCH_WAIT))
+        elif len(self._openai_pending) >= OPENAI_BATCH_MAX:
+            batch, self._openai_pending = self._openai_pending, []
+            self._spawn(self._send_openai_batch(batch))
+        return await fut
+    
+    def _spawn(self, coro):
+        task = asyncio.get_running_loop().create_task(coro)
+        self._openai_tasks.add(task)
+        task.add_done_callback(self._openai_tasks.discard)
+    
+    async def _flush_openai_after(self, delay: float):
+        await asyncio.sleep(delay)
+        batch, self._openai_pending = self._openai_pending, []
+        if batch:
+            await self._send_openai_batch(batch)
+    
+    async def _send_openai_batch(self, batch: list):
+        """One moderation request for the whole batch; results come back in input order"""
+        results = [(False, {}, 0.0)] * len(batch)
         try:
-            async with aiohttp.ClientSession() as session:
-                headers = {
-                    'Authorization': f'Bearer {OPENAI_API_KEY}',
-                    'Content-Type': 'application/json'
-                }
-                data = {'input': text}
-                
-                async with session.post(
-                    'https://api.openai.com/v1/moderations',
-                    headers=headers, 
-                    json=data,
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as resp:
-                    if resp.status == 200:
-                        result = await resp.json()
-                        moderation = result['results'][0]
-                        
+            headers = {
+                'Authorization': f'Bearer {OPENAI_API_KEY}',
+                'Content-Type': 'application/json'
+            }
+            data = {'input': [text for text, _ in batch]}
+            
+            async with self._get_session().post(
+                'https://api.openai.com/v1/moderations',
+                headers=headers, 
+                json=data,
+                timeout=aiohttp.ClientTimeout(total=10)
+            ) as resp:
+                if resp.status == 200:
+                    result = await resp.json()
+                    results = []
+                    for moderation in result['results']:
                         # Calculate confidence based on category scores
                         category_scores = moderation.get('category_scores', {})
                         max_confidence = max(category_scores.values()) if category_scores else 0.0
-                        
-                        return moderation['flagged'], moderation['categories'], max_confidence
-                    return False, {}, 0.0
+                        results.append((moderation['flagged'], moderation['categories'], max_confidence))
+                    self._openai_breaker.record_success()
+                else:
+                    log.warning("OpenAI Moderation error: HTTP %s", resp.status)
+                    self._openai_breaker.record_failure()
                     
         except Exception as e:
-            print(f"OpenAI Moderation error: {e}")
-            return False, {}, 0.0
+            log.warning("OpenAI Moderation error: %s", e)
+            self._openai_breaker.record_failure()
+        
+        for i, (_, fut) in enumerate(batch):
+            if not fut.done():
+                fut.set_result(results[i] if i < len(results) else (False, {}, 0.0))
     
     def check_fallback_patterns(self, text: str) -> Tuple[str, str]:
         """
@@ -115,25 +210,32 @@ class ToxicityDetector:
         Returns:
             Tuple[str, str]: (severity_level, reason)
         """
-        for level, patterns in self.fallback_patterns.items():
-            for pattern in patterns:
-                if pattern.search(text):
-                    return level, f"pattern match ({level})"
+        for level, pattern in self.fallback_patterns.items():
+            if pattern.search(text):
+                return level, f"pattern match ({level})"
         return "none", ""
     
-    async def analyze_toxicity(self, text: str) -> Dict:
+    async def analyze_toxicity(self, text: str, apis_enabled: bool = True) -> Dict:
         """
         Comprehensive toxicity analysis using multiple methods
         
+        Args:
+            text: Message text to analyze
+            apis_enabled: When False, skip Perspective/OpenAI and report only the fallback patterns
+        
         Returns:
             Dict: Complete analysis results
         """
-        # Run both AI detections concurrently
-        perspective_task = self.check_perspective_api(text)
-        openai_task = self.check_openai_moderation(text)
-        
-        perspective_score, perspective_details = await perspective_task
-        openai_flagged, openai_categories, openai_confidence = await openai_task
+        if apis_enabled:
+            # Run both AI detections concurrently
+            (perspective_score, perspective_details), (openai_flagged, openai_categories, openai_confidence) = \
+                await asyncio.gather(
+                    self.check_perspective_api(text),
+                    self.check_openai_moderation(text)
+                )
+        else:
+            perspective_score, perspective_details = 0.0, {}
+            openai_flagged, openai_categories, openai_confidence = False, {}, 0.0
         
         # Fallback detection
         fallback_level, fallback_reason = self.check_fallback_patterns(text)
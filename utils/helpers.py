@@ -5,10 +5,32 @@ General utility functions for the Discord moderation bot
 import re
 import time
 import asyncio
-from typing import List, Dict, Optional, Union, Tuple
+import heapq
+import itertools
+from collections import deque
+from functools import lru_cache
+from typing import List, Dict, Optional, Union, Tuple, NamedTuple, Iterable, Iterator
 from datetime import datetime, timezone, timedelta
 import discord
 
+# Compiled once at import; these helpers can run on every message
+_USER_MENTION_RE = re.compile(r'<@!?(\d+)>')
+_CHANNEL_MENTION_RE = re.compile(r'<#(\d+)>')
+_URL_RE = re.compile(r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+')
+# User mentions, channel mentions and URLs in one pass, for parse_message
+_ENTITIES_RE = re.compile(
+    r'<@!?(?P<uid>\d+)>|<#(?P<cid>\d+)>|(?P<url>' + _URL_RE.pattern + r')'
+)
+_DURATION_MULTIPLIERS = {
+    's': 1,
+    'm': 60,
+    'h': 3600,
+    'd': 86400
+}
+
+# Zero-width characters (used to dodge word filters) deleted by clean_text
+_ZERO_WIDTH_TRANS = str.maketrans('', '', '\u200b\u200c\u200d\ufeff')
+
 def format_timestamp(timestamp: float, style: str = "R") -> str:
     """
     Format a Unix timestamp for Discord
@@ -22,6 +44,26 @@ def format_timestamp(timestamp: float, style: str = "R") -> str:
     """
     return f"<t:{int(timestamp)}:{style}>"
 
+# (monotonic time of last refresh, cached aware UTC datetime)
+_utcnow_cache: list = [float("-inf"), None]
+
+def utcnow_cached(max_age: float = 1.0) -> datetime:
+    """
+    Current UTC time, reused for up to max_age seconds
+    
+    Args:
+        max_age: How stale (in seconds) the returned value may be
+        
+    Returns:
+        Timezone-aware UTC datetime (second resolution is plenty for embed timestamps)
+    """
+    mono = time.monotonic()
+    if mono - _utcnow_cache[0] >= max_age:
+        _utcnow_cache[0] = mono
+        _utcnow_cache[1] = datetime.now(timezone.utc)
+    return _utcnow_cache[1]
+
+@lru_cache(maxsize=4096)
 def format_duration(seconds: int) -> str:
     """
     Format seconds into human-readable duration
@@ -80,13 +122,9 @@ def clean_text(text: str) -> str:
     Returns:
         Cleaned text
     """
-    # Remove excessive whitespace
-    text = re.sub(r'\s+', ' ', text.strip())
-    
-    # Remove zero-width characters that might be used to evade detection
-    text = re.sub(r'[\u200b-\u200d\ufeff]', '', text)
-    
-    return text
+    # Remove zero-width characters that might be used to evade detection,
+    # then collapse whitespace (split/join is one C pass each, no regex engine)
+    return ' '.join(text.translate(_ZERO_WIDTH_TRANS).split())
 
 def extract_user_ids(text: str) -> List[int]:
     """
@@ -98,9 +136,7 @@ def extract_user_ids(text: str) -> List[int]:
     Returns:
         List of user IDs found in mentions
     """
-    pattern = r'<@!?(\d+)>'
-    matches = re.findall(pattern, text)
-    return [int(match) for match in matches]
+    return [int(match) for match in _USER_MENTION_RE.findall(text)]
 
 def extract_channel_ids(text: str) -> List[int]:
     """
@@ -112,9 +148,37 @@ def extract_channel_ids(text: str) -> List[int]:
     Returns:
         List of channel IDs found in mentions
     """
-    pattern = r'<#(\d+)>'
-    matches = re.findall(pattern, text)
-    return [int(match) for match in matches]
+    return [int(match) for match in _CHANNEL_MENTION_RE.findall(text)]
+
+class ParsedMessage(NamedTuple):
+    """Mentions and links found in a message by parse_message"""
+    user_ids: Tuple[int, ...]
+    channel_ids: Tuple[int, ...]
+    urls: Tuple[str, ...]
+
+@lru_cache(maxsize=1024)
+def parse_message(text: str) -> ParsedMessage:
+    """
+    Extract user IDs, channel IDs and URLs with a single scan over the text
+    
+    Use this instead of calling the individual extractors when more than one is needed.
+    
+    Args:
+        text: Message text
+        
+    Returns:
+        ParsedMessage with each category in order of appearance
+    """
+    user_ids, channel_ids, urls = [], [], []
+    for match in _ENTITIES_RE.finditer(text):
+        kind = match.lastgroup
+        if kind == 'uid':
+            user_ids.append(int(match['uid']))
+        elif kind == 'cid':
+            channel_ids.append(int(match['cid']))
+        else:
+            urls.append(match['url'])
+    return ParsedMessage(tuple(user_ids), tuple(channel_ids), tuple(urls))
 
 def is_url(text: str) -> bool:
     """
@@ -126,8 +190,7 @@ def is_url(text: str) -> bool:
     Returns:
         True if text contains URLs
     """
-    url_pattern = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
-    return bool(re.search(url_pattern, text))
+    return _URL_RE.search(text) is not None
 
 def get_urls(text: str) -> List[str]:
     """
@@ -139,8 +202,27 @@ def get_urls(text: str) -> List[str]:
     Returns:
         List of URLs found in text
     """
-    url_pattern = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
-    return re.findall(url_pattern, text)
+    return _URL_RE.findall(text)
+
+# Width of text_signature bitsets (one bit per hashed word)
+SIGNATURE_BITS = 1024
+
+def text_signature(text: str) -> int:
+    """
+    Hash each lowercased word of text to one bit of a SIGNATURE_BITS-wide bitset
+    
+    Signatures use Python's salted str hash, so only compare ones built in the same process.
+    
+    Args:
+        text: Text to sign
+        
+    Returns:
+        Signature as an int bitset
+    """
+    sig = 0
+    for word in set(text.lower().split()):
+        sig |= 1 << (hash(word) % SIGNATURE_BITS)
+    return sig
 
 def calculate_text_similarity(text1: str, text2: str) -> float:
     """
@@ -165,6 +247,27 @@ def calculate_text_similarity(text1: str, text2: str) -> float:
     
     return len(intersection) / len(union) if union else 0.0
 
+def signature_similarity(sig1: int, sig2: int) -> float:
+    """
+    Approximate Jaccard similarity of two text_signature() bitsets from the same process
+    
+    Lets one message be compared against many without re-splitting it. Words that hash to
+    the same bit are counted once, so collisions can push the score either way (shared words
+    colliding shrink the intersection); use calculate_text_similarity for the exact value.
+    
+    Args:
+        sig1: First text's signature
+        sig2: Second text's signature
+        
+    Returns:
+        Similarity score between 0 and 1
+    """
+    union = (sig1 | sig2).bit_count()
+    if not union:
+        return 1.0
+    
+    return (sig1 & sig2).bit_count() / union
+
 def rate_limit_check(last_action_time: float, cooldown_seconds: int = 5) -> Tuple[bool, float]:
     """
     Check if action is rate limited
@@ -210,10 +313,109 @@ async def safe_send_message(channel: discord.TextChannel, content: str = None,
         print(f"Unexpected error sending message: {e}")
         return None
 
+BULK_DELETE_MAX = 100  # Discord's limit per bulk delete request
+BULK_DELETE_MAX_AGE = timedelta(days=14)  # Older messages can only be deleted one by one
+
+async def _delete_single(message: discord.Message) -> bool:
+    try:
+        await message.delete()
+        return True
+    except discord.NotFound:
+        return True  # Message already deleted
+    except Exception:
+        return False
+
+async def bulk_delete_messages(messages: List[discord.Message]) -> List[bool]:
+    """
+    Delete messages from one channel, in bulk requests wherever Discord allows it
+    
+    Args:
+        messages: Messages from the same channel
+        
+    Returns:
+        Per-message deletion results, in the same order
+    """
+    results = [False] * len(messages)
+    cutoff = discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+    bulk = [i for i, msg in enumerate(messages) if msg.created_at > cutoff]
+    single = [i for i, msg in enumerate(messages) if msg.created_at <= cutoff]
+    
+    for start in range(0, len(bulk), BULK_DELETE_MAX):
+        chunk = bulk[start:start + BULK_DELETE_MAX]
+        if len(chunk) == 1:
+            single.extend(chunk)
+            continue
+        try:
+            await messages[chunk[0]].channel.delete_messages([messages[i] for i in chunk])
+        except Exception:
+            # Retry one by one so each message gets its own result (this includes Forbidden:
+            # bulk delete needs Manage Messages even for our own messages, a single delete doesn't)
+            single.extend(chunk)
+            continue
+        for i in chunk:
+            results[i] = True
+    
+    for i in single:
+        results[i] = await _delete_single(messages[i])
+    return results
+
+class DeletionScheduler:
+    """Deletes messages at their scheduled times from one worker, bulk-deleting per channel"""
+    
+    def __init__(self):
+        # (due loop time, tiebreak, message, future) min-heap
+        self._heap: list = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+    
+    def schedule(self, message: discord.Message, delay: float) -> asyncio.Future:
+        """Queue a delete; the future resolves with whether it succeeded"""
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        heapq.heappush(self._heap, (loop.time() + delay, next(self._seq), message, fut))
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._worker = loop.create_task(self._run())
+        elif self._heap[0][3] is fut:
+            self._wakeup.set()  # new earliest deadline; re-arm the worker's sleep
+        return fut
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while self._heap:
+            delay = self._heap[0][0] - loop.time()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            # Everything due now, grouped by channel for bulk deletes
+            now = loop.time()
+            by_channel: Dict[int, list] = {}
+            while self._heap and self._heap[0][0] <= now:
+                _, _, message, fut = heapq.heappop(self._heap)
+                by_channel.setdefault(message.channel.id, []).append((message, fut))
+            
+            await asyncio.gather(*(self._delete(entries) for entries in by_channel.values()))
+    
+    async def _delete(self, entries: list):
+        results = await bulk_delete_messages([message for message, _ in entries])
+        for (_, fut), deleted in zip(entries, results):
+            if not fut.done():
+                fut.set_result(deleted)
+
+_deletion_scheduler = DeletionScheduler()
+
 async def safe_delete_message(message: discord.Message, delay: float = 0) -> bool:
     """
     Safely delete a message with optional delay
     
+    Delayed deletes share one timer and are bulk-deleted together per channel.
+    
     Args:
         message: Discord message to delete
         delay: Delay before deletion in seconds
@@ -221,9 +423,10 @@ async def safe_delete_message(message: discord.Message, delay: float = 0) -> boo
     Returns:
         True if deletion was successful
     """
+    if delay > 0:
+        return await _deletion_scheduler.schedule(message, delay)
+    
     try:
-        if delay > 0:
-            await asyncio.sleep(delay)
         await message.delete()
         return True
     except discord.NotFound:
@@ -273,22 +476,19 @@ def parse_time_string(time_str: str) -> Optional[int]:
     """
     time_str = time_str.lower().strip()
     
-    # Match pattern like "1h", "30m", "2d", "45s"
-    match = re.match(r'^(\d+)([smhd])$', time_str)
-    if not match:
+    # Digits followed by one unit letter, like "1h", "30m", "2d", "45s"
+    amount, multiplier = time_str[:-1], _DURATION_MULTIPLIERS.get(time_str[-1:])
+    if multiplier is None or not amount.isdecimal():
         return None
     
-    amount, unit = match.groups()
-    amount = int(amount)
-    
-    multipliers = {
-        's': 1,
-        'm': 60,
-        'h': 3600,
-        'd': 86400
-    }
-    
-    return amount * multipliers.get(unit, 1)
+    return int(amount) * multiplier
+
+_STATUS_EMOJI = {
+    discord.Status.online: "🟢",
+    discord.Status.idle: "🟡",
+    discord.Status.dnd: "🔴",
+    discord.Status.offline: "⚫"
+}
 
 def get_member_status_emoji(member: discord.Member) -> str:
     """
@@ -300,13 +500,7 @@ def get_member_status_emoji(member: discord.Member) -> str:
     Returns:
         Status emoji string
     """
-    status_map = {
-        discord.Status.online: "🟢",
-        discord.Status.idle: "🟡",
-        discord.Status.dnd: "🔴",
-        discord.Status.offline: "⚫"
-    }
-    return status_map.get(member.status, "⚫")
+    return _STATUS_EMOJI.get(member.status, "⚫")
 
 def chunk_list(lst: List, chunk_size: int) -> List[List]:
     """
@@ -321,6 +515,23 @@ def chunk_list(lst: List, chunk_size: int) -> List[List]:
     """
     return [lst[i:i + chunk_size] for i in range(0, len(lst), chunk_size)]
 
+def iter_chunks(items: Iterable, chunk_size: int) -> Iterator[List]:
+    """
+    Lazily split any iterable into chunks of specified size
+    
+    Only one chunk exists at a time, so prefer this over chunk_list when the
+    chunks are consumed once (e.g. sending batches) rather than indexed.
+    
+    Args:
+        items: Iterable to chunk
+        chunk_size: Maximum size of each chunk
+        
+    Returns:
+        Iterator of chunk lists
+    """
+    it = iter(items)
+    return iter(lambda: list(itertools.islice(it, chunk_size)), [])
+
 def format_user_info(user: Union[discord.User, discord.Member]) -> str:
     """
     Format user information for display
@@ -331,23 +542,23 @@ def format_user_info(user: Union[discord.User, discord.Member]) -> str:
     Returns:
         Formatted user info string
     """
-    info = f"{user.display_name} (`{user.id}`)"
+    parts = [f"{user.display_name} (`{user.id}`)"]
     
     if isinstance(user, discord.Member):
         if user.nick:
-            info += f"\n**Nickname:** {user.nick}"
+            parts.append(f"**Nickname:** {user.nick}")
         
         if user.joined_at:
             joined = format_timestamp(user.joined_at.timestamp(), "F")
-            info += f"\n**Joined:** {joined}"
+            parts.append(f"**Joined:** {joined}")
         
         status_emoji = get_member_status_emoji(user)
-        info += f"\n**Status:** {status_emoji} {user.status}"
+        parts.append(f"**Status:** {status_emoji} {user.status}")
     
     created = format_timestamp(user.created_at.timestamp(), "F")
-    info += f"\n**Created:** {created}"
+    parts.append(f"**Created:** {created}")
     
-    return info
+    return "\n".join(parts)
 
 class RateLimiter:
     """Simple rate limiter for API calls or actions"""
@@ -355,28 +566,28 @@ class RateLimiter:
     def __init__(self, max_calls: int, window_seconds: int):
         self.max_calls = max_calls
         self.window_seconds = window_seconds
-        self.calls = []
+        # Monotonic call times, oldest first, so expiry only ever pops from the left
+        self.calls = deque()
     
     def can_proceed(self) -> bool:
         """Check if action can proceed without hitting rate limit"""
-        now = time.time()
-        
         # Remove old calls outside the window
-        self.calls = [call_time for call_time in self.calls 
-                     if now - call_time < self.window_seconds]
+        cutoff = time.monotonic() - self.window_seconds
+        calls = self.calls
+        while calls and calls[0] <= cutoff:
+            calls.popleft()
         
-        return len(self.calls) < self.max_calls
+        return len(calls) < self.max_calls
     
     def record_call(self):
         """Record that a call was made"""
-        self.calls.append(time.time())
+        self.calls.append(time.monotonic())
     
     def time_until_reset(self) -> float:
         """Get time in seconds until rate limit resets"""
         if not self.calls:
             return 0.0
         
-        oldest_call = min(self.calls)
-        reset_time = oldest_call + self.window_seconds
+        reset_time = self.calls[0] + self.window_seconds
         
-        return max(0.0, reset_time - time.time())
\ No newline at end of file
+        return max(0.0, reset_time - time.monotonic())
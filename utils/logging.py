@@ -2,10 +2,65 @@
 Enhanced logging system with Discord embeds
 """
 
+import asyncio
+import atexit
+import heapq
+import logging
+import logging.handlers
+import queue
+import time
+from itertools import islice
+from operator import itemgetter
 import discord
-from datetime import datetime, timezone
 from typing import Optional, Dict, Any
 from config.settings import MOD_LOG_CHANNEL_ID
+from utils.helpers import utcnow_cached
+
+# Log embeds are buffered per channel and posted together after this delay, packed into
+# as few messages as Discord allows (10 embeds / 6000 characters per message)
+LOG_FLUSH_DELAY = 1.0
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+# Repeats of an identical moderation log (same user, level, reason, strike count and
+# punishment) within this window are suppressed; one summary is posted when it closes
+LOG_DEDUPE_WINDOW_SEC = 5.0
+LOG_DEDUPE_MAX = 1024
+
+# No mod-log channel configured: every log_* call returns before building anything
+_LOGGING_DISABLED = MOD_LOG_CHANNEL_ID == 0
+
+# Console status/errors: records are queued and written by a listener thread, so emitting
+# on the event loop is just an enqueue (and %-args aren't formatted when filtered out)
+log = logging.getLogger("modbot")
+# ModLogger's own failures; propagates to the modbot handler
+modlog = logging.getLogger("modbot.modlog")
+_log_listener: Optional[logging.handlers.QueueListener] = None
+
+def setup_logging(level: int = logging.INFO):
+    """Attach the queued console handler to the modbot logger (idempotent)"""
+    global _log_listener
+    if _log_listener is not None:
+        return
+    records = queue.SimpleQueue()
+    _log_listener = logging.handlers.QueueListener(records, logging.StreamHandler())
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+    log.addHandler(logging.handlers.QueueHandler(records))
+    log.setLevel(level)
+    log.propagate = False
+
+# Embed colours, built once (discord.Color.* constructs a new object per call)
+_COL_BLUE = discord.Color.blue()
+_COL_RED = discord.Color.red()
+_COL_DARK_GREY = discord.Color.dark_grey()
+
+# Action-taken line per punishment type (one lookup instead of an if/elif chain)
+_PUNISHMENT_FORMATTERS = {
+    "timeout": lambda p: f"⏱️ Timeout: {p.get('duration', 0)} minutes",
+    "kick": lambda p: "👢 User kicked from server",
+    "warning": lambda p: "⚠️ Warning issued",
+}
 
 class ModLogger:
     """Handles moderation logging with rich embeds"""
@@ -14,24 +69,88 @@ class ModLogger:
         self.color_map = {
             "warn": discord.Color.yellow(),
             "flag": discord.Color.orange(),
-            "severe": discord.Color.red(),
-            "info": discord.Color.blue(),
+            "severe": _COL_RED,
+            "info": _COL_BLUE,
             "success": discord.Color.green()
         }
+        # guild_id -> resolved log channel, or None when the guild doesn't have it
+        self._log_channels: Dict[int, Optional[discord.TextChannel]] = {}
+        # channel_id -> (channel, embeds waiting for the next flush)
+        self._pending_embeds: Dict[int, tuple] = {}
+        self._flush_tasks: set = set()
+        # moderation log signature -> [window start, repeats suppressed]
+        self._recent_signatures: Dict[tuple, list] = {}
     
     async def get_log_channel(self, guild: discord.Guild) -> Optional[discord.TextChannel]:
-        """Get the moderation log channel"""
-        if MOD_LOG_CHANNEL_ID == 0:
+        """Get the moderation log channel (resolved once per guild, then cached)"""
+        if _LOGGING_DISABLED:
             return None
         
+        try:
+            return self._log_channels[guild.id]
+        except KeyError:
+            pass
+        
         try:
             channel = guild.get_channel(MOD_LOG_CHANNEL_ID)
             if not channel:
                 channel = await guild.fetch_channel(MOD_LOG_CHANNEL_ID)
-            return channel
+        except discord.NotFound:
+            channel = None  # not in this guild; don't ask the API again on every log
         except Exception as e:
-            print(f"[mod-log] Error getting channel: {e}")
+            modlog.warning("Error getting channel: %s", e)
             return None
+        self._log_channels[guild.id] = channel
+        return channel
+    
+    def forget_log_channel(self, channel: discord.abc.GuildChannel):
+        """Drop the cached log channel if it was deleted"""
+        if channel.id == MOD_LOG_CHANNEL_ID:
+            self._log_channels.pop(channel.guild.id, None)
+    
+    def _queue_embed(self, channel: discord.TextChannel, embed: discord.Embed):
+        """Buffer an embed for the channel's next batched post"""
+        pending = self._pending_embeds.get(channel.id)
+        if pending is None:
+            pending = self._pending_embeds[channel.id] = (channel, [])
+            task = asyncio.get_running_loop().create_task(self._flush_embeds(channel.id))
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+        pending[1].append(embed)
+    
+    async def _flush_embeds(self, channel_id: int):
+        await asyncio.sleep(LOG_FLUSH_DELAY)
+        channel, embeds = self._pending_embeds.pop(channel_id)
+        
+        # Pack consecutive embeds into messages within Discord's per-message limits
+        batches, batch, size = [], [], 0
+        for embed in embeds:
+            n = len(embed)
+            if batch and (len(batch) == MAX_EMBEDS_PER_MESSAGE or size + n > MAX_EMBED_CHARS_PER_MESSAGE):
+                batches.append(batch)
+                batch, size = [], 0
+            batch.append(embed)
+            size += n
+        batches.append(batch)
+        
+        for batch in batches:
+            try:
+                await channel.send(embeds=batch)
+            except discord.Forbidden:
+                modlog.warning("No permission to send to log channel in %s", channel.guild.name)
+                return
+            except discord.HTTPException as e:
+                if len(batch) == 1:
+                    modlog.warning("Error sending log embed: %s", e)
+                    continue
+                # One bad embed rejects the whole message; send them singly so the rest still land
+                for embed in batch:
+                    try:
+                        await channel.send(embed=embed)
+                    except Exception as e:
+                        modlog.warning("Error sending log embed: %s", e)
+            except Exception as e:
+                modlog.warning("Error sending %d log embeds: %s", len(batch), e)
     
     def create_moderation_embed(self, user: discord.User, channel: discord.TextChannel,
                               level: str, reason: str, strike_count: int,
@@ -40,8 +159,8 @@ class ModLogger:
         
         embed = discord.Embed(
             title=f"🛡️ Moderation Action - {level.upper()}",
-            color=self.color_map.get(level, discord.Color.dark_grey()),
-            timestamp=datetime.now(timezone.utc)
+            color=self.color_map.get(level, _COL_DARK_GREY),
+            timestamp=utcnow_cached()
         )
         
         # User information
@@ -103,13 +222,9 @@ class ModLogger:
             actions.append("📨 DM warning failed (user has DMs disabled)")
         
         # Punishment details
-        if punishment.get("action") == "timeout":
-            duration = punishment.get("duration", 0)
-            actions.append(f"⏱️ Timeout: {duration} minutes")
-        elif punishment.get("action") == "kick":
-            actions.append("👢 User kicked from server")
-        elif punishment.get("action") == "warning":
-            actions.append("⚠️ Warning issued")
+        formatter = _PUNISHMENT_FORMATTERS.get(punishment.get("action"))
+        if formatter:
+            actions.append(formatter(punishment))
         
         # Errors
         errors = results.get("errors", [])
@@ -124,9 +239,18 @@ class ModLogger:
                                   analysis: Dict[str, Any] = None):
         """Log a moderation action with detailed information"""
         
+        if _LOGGING_DISABLED:
+            return
+        
         log_channel = await self.get_log_channel(guild)
         if not log_channel:
-            print(f"[mod-log] No log channel configured for {guild.name}")
+            modlog.info("No log channel configured for %s", guild.name)
+            return
+        
+        punishment = action_results.get("punishment_details", {})
+        signature = (guild.id, user.id, level, reason, strike_count,
+                     punishment.get("action"), punishment.get("duration"))
+        if self._is_repeat(signature, log_channel, user):
             return
         
         try:
@@ -139,12 +263,59 @@ class ModLogger:
             if analysis:
                 self._add_analysis_to_embed(embed, analysis)
             
-            await log_channel.send(embed=embed)
+            self._queue_embed(log_channel, embed)
             
-        except discord.Forbidden:
-            print(f"[mod-log] No permission to send to log channel in {guild.name}")
         except Exception as e:
-            print(f"[mod-log] Error logging action: {e}")
+            modlog.warning("Error logging action: %s", e)
+    
+    def _is_repeat(self, signature: tuple, log_channel: discord.TextChannel,
+                   user: discord.User) -> bool:
+        """
+        Track a moderation log signature for duplicate suppression
+        
+        Returns:
+            bool: True if an identical entry was posted within the window (skip this one)
+        """
+        now = time.monotonic()
+        recent = self._recent_signatures.get(signature)
+        if recent is not None and now - recent[0] < LOG_DEDUPE_WINDOW_SEC:
+            recent[1] += 1
+            if recent[1] == 1:
+                # First repeat in this window: post the count once the window closes
+                task = asyncio.get_running_loop().create_task(self._post_repeat_summary(
+                    recent, signature, log_channel, user, recent[0] + LOG_DEDUPE_WINDOW_SEC - now
+                ))
+                self._flush_tasks.add(task)
+                task.add_done_callback(self._flush_tasks.discard)
+            return True
+        
+        if recent is None and len(self._recent_signatures) >= LOG_DEDUPE_MAX:
+            self._recent_signatures = {
+                k: v for k, v in self._recent_signatures.items()
+                if now - v[0] < LOG_DEDUPE_WINDOW_SEC
+            }
+        self._recent_signatures[signature] = [now, 0]
+        return False
+    
+    async def _post_repeat_summary(self, entry: list, signature: tuple,
+                                   log_channel: discord.TextChannel, user: discord.User,
+                                   delay: float):
+        """Log how many identical entries a closed dedupe window suppressed"""
+        await asyncio.sleep(delay)
+        _, _, level, reason, strike_count, action, duration = signature
+        action_text = f"{action} ({duration} min)" if duration else (action or "none")
+        embed = discord.Embed(
+            title=f"🛡️ Repeated Moderation Action - {level.upper()}",
+            description=(
+                f"{user.mention} (`{user.id}`): {entry[1]} more identical "
+                f"{'entry' if entry[1] == 1 else 'entries'} within {LOG_DEDUPE_WINDOW_SEC:.0f}s\n"
+                f"**Reason:** {reason}\n**Strikes:** {strike_count}\n**Action:** {action_text}"
+            ),
+            color=self.color_map.get(level, _COL_DARK_GREY),
+            timestamp=utcnow_cached()
+        )
+        embed.set_footer(text="ModBot Auto-Moderation")
+        self._queue_embed(log_channel, embed)
     
     def _add_analysis_to_embed(self, embed: discord.Embed, analysis: Dict[str, Any]):
         """Add AI analysis details to the embed"""
@@ -162,23 +333,22 @@ class ModLogger:
             # Add top scoring categories
             details = perspective.get("details", {})
             if details:
-                top_categories = sorted(
-                    [(k, v) for k, v in details.items() if v > 0.3],
-                    key=lambda x: x[1],
-                    reverse=True
-                )[:2]
+                top_categories = heapq.nlargest(
+                    2, ((k, v) for k, v in details.items() if v > 0.3), key=itemgetter(1)
+                )
                 
                 if top_categories:
-                    cat_text = ", ".join([f"{k.lower()}: {v:.2f}" for k, v in top_categories])
+                    cat_text = ", ".join(f"{k.lower()}: {v:.2f}" for k, v in top_categories)
                     analysis_text.append(f"**Categories:** {cat_text}")
         
         # OpenAI results
         if openai.get("flagged"):
-            flagged_categories = [
-                k for k, v in openai.get("categories", {}).items() if v
-            ]
+            # Only the first three are shown, so stop looking once we have them
+            flagged_categories = list(islice(
+                (k for k, v in openai.get("categories", {}).items() if v), 3
+            ))
             if flagged_categories:
-                analysis_text.append(f"**OpenAI:** {', '.join(flagged_categories[:3])}")
+                analysis_text.append(f"**OpenAI:** {', '.join(flagged_categories)}")
         
         if analysis_text:
             embed.add_field(
@@ -191,6 +361,9 @@ class ModLogger:
                              message: str, level: str = "info"):
         """Log system events (channel moderation toggled, etc.)"""
         
+        if _LOGGING_DISABLED:
+            return
+        
         log_channel = await self.get_log_channel(guild)
         if not log_channel:
             return
@@ -199,21 +372,24 @@ class ModLogger:
             embed = discord.Embed(
                 title=f"📊 System Event - {event_type}",
                 description=message,
-                color=self.color_map.get(level, discord.Color.blue()),
-                timestamp=datetime.now(timezone.utc)
+                color=self.color_map.get(level, _COL_BLUE),
+                timestamp=utcnow_cached()
             )
             
             embed.set_footer(text="ModBot System")
-            await log_channel.send(embed=embed)
+            self._queue_embed(log_channel, embed)
             
         except Exception as e:
-            print(f"[system-log] Error: {e}")
+            modlog.warning("System event log error: %s", e)
     
     async def log_message_content(self, guild: discord.Guild, user: discord.User,
                                 channel: discord.TextChannel, content: str,
                                 level: str):
         """Log the actual message content (for severe violations)"""
         
+        if _LOGGING_DISABLED:
+            return
+        
         log_channel = await self.get_log_channel(guild)
         if not log_channel:
             return
@@ -221,8 +397,8 @@ class ModLogger:
         try:
             embed = discord.Embed(
                 title="📝 Message Content",
-                color=self.color_map.get(level, discord.Color.red()),
-                timestamp=datetime.now(timezone.utc)
+                color=self.color_map.get(level, _COL_RED),
+                timestamp=utcnow_cached()
             )
             
             embed.add_field(
@@ -231,8 +407,16 @@ class ModLogger:
                 inline=False
             )
             
-            # Truncate very long messages
-            truncated_content = content[:1000] + "..." if len(content) > 1000 else content
+            # Truncate very long messages, then break up ``` so the content can't close the code
+            # block. Escaping adds a character per backtick, so backtick-heavy text can still
+            # need a cut to fit the 1024-character field (1018 inside the fences)
+            was_truncated = len(content) > 1000
+            truncated_content = content[:1000] + "..." if was_truncated else content
+            if "```" in truncated_content:
+                truncated_content = truncated_content.replace("`", "`\u200b")
+                if len(truncated_content) > 1018:
+                    was_truncated = True
+                    truncated_content = truncated_content[:1014] + "\u200b..."
             
             embed.add_field(
                 name="Content",
@@ -240,14 +424,14 @@ class ModLogger:
                 inline=False
             )
             
-            if len(content) > 1000:
+            if was_truncated:
                 embed.add_field(
                     name="Note",
                     value="Message was truncated for display",
                     inline=False
                 )
             
-            await log_channel.send(embed=embed)
+            self._queue_embed(log_channel, embed)
             
         except Exception as e:
-            print(f"[content-log] Error: {e}")
\ No newline at end of file
+            modlog.warning("Content log error: %s", e)
\ No newline at end of file